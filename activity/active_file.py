@@ -1,13 +1,16 @@
-import yaml
+import os
 import datetime
 import requests
-from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from urllib3.util.retry import Retry
 
 from utils.logger import log
 from utils.yaml_utils import load_yaml, save_to_file
 from utils.usage import extract_repo, extract_repo_name
 from utils.github_utils import github_limit
+from utils.cf_utils import is_cf_content, MAX_FILE_SIZE
+from utils.http_cache import CachingAdapter, log_http_cache
+from activity.local_history import local_history, find_changed_tf_file, find_changed_cf_file
 
 SESSION = requests.Session()
 RETRIES = Retry(
@@ -17,11 +20,46 @@ RETRIES = Retry(
     allowed_methods=["GET"]
 )
 
-ADAPTER = HTTPAdapter(max_retries=RETRIES)
+# raw files downloaded in parallel while checking one repository
+FETCH_WORKERS = 8
+# raw file contents by blob SHA, a blob never changes
+RAW_CACHE_DIR = '.cache/raw_files'
+
+# caches only once enable_http_cache() was called
+ADAPTER = CachingAdapter(max_retries=RETRIES, pool_maxsize=FETCH_WORKERS)
 SESSION.mount('https://', ADAPTER)
 SESSION.mount('http://', ADAPTER)
 
-def check_tf_file(github_client, file_path, log_file, active_dump, months=12):
+def with_average_activity(activity):
+    return dict(activity, average_activity=(activity["commits"] + activity["issues"] + activity["pulls"]) / 3)
+
+def join_activity(active_files_path, active_repos_path):
+    # check_tf_file/check_cf_file list URLs; keywords and run_linter expect the activity entries of the
+    # repos, with their average activity, as in results/active/*_file.yml
+    activities = {}
+    for entry in load_yaml(active_repos_path) or []:
+        if isinstance(entry, dict):
+            activities[entry["repo"]] = entry
+    joined = []
+    for repo in load_yaml(active_files_path) or []:
+        if isinstance(repo, dict):
+            joined.append(repo)
+        elif repo in activities:
+            joined.append(with_average_activity(activities[repo]))
+        else:
+            joined.append({"repo": repo})
+    save_to_file(joined, active_files_path)
+
+def check_file_locally(repo, since, log_file, file_type):
+    # answers "did a file of this type change since the cutoff?" from a local history-only clone
+    with local_history(repo, since, log_file) as history_dir:
+        if history_dir is None:
+            return None
+        if file_type == "tf":
+            return find_changed_tf_file(history_dir, since)
+        return find_changed_cf_file(history_dir, since, log_file)
+
+def check_tf_file(github_client, file_path, log_file, active_dump, months=12, backend="api"):
     repositories = load_yaml(file_path)
     repositories = extract_repo(repositories)
 
@@ -30,6 +68,20 @@ def check_tf_file(github_client, file_path, log_file, active_dump, months=12):
 
     for repo in repositories:
         repo_name = extract_repo_name(repo)
+        if backend == "local":
+            log(f"\tChecking repository: {repo}", log_file)
+            try:
+                changed_file = check_file_locally(repo, since, log_file, "tf")
+            except Exception as e:
+                log(f"\t\tError checking repository {repo_name}: {e}", log_file)
+                continue
+            if changed_file:
+                log(f"\t\tTerraform file changed: {changed_file}", log_file)
+                active_repos.append(repo)
+            else:
+                log(f"\t\tNo Terraform files changed in the last {months} months for {repo_name}", log_file)
+            continue
+
         try:
             github_limit(github_client, log_file)
             repository = github_client.get_repo(repo_name)
@@ -59,41 +111,94 @@ def check_tf_file(github_client, file_path, log_file, active_dump, months=12):
             log(f"\t\tError checking repository {repo_name}: {e}", log_file)
 
     log(f"\nActive repositories with Terraform files changed in the last {months} months: {len(active_repos)}", log_file)
+    log_http_cache(log_file)
     save_to_file(active_repos, active_dump)
 
-def is_cloudformation_yaml_file(raw_url, log_file):
+def read_raw_file(raw_url, blob_sha=None):
+    cache_path = os.path.join(RAW_CACHE_DIR, blob_sha[:2], blob_sha) if blob_sha else None
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, 'rb') as file:
+            return file.read()
+
+    response = SESSION.get(raw_url, timeout=10, stream=True)
+    if response.status_code != 200:
+        response.close()
+        return None
+    # never read more than the classifier would look at
+    content = response.raw.read(MAX_FILE_SIZE + 1, decode_content=True)
+    response.close()
+
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        partial_path = f"{cache_path}.{os.getpid()}.partial"
+        with open(partial_path, 'wb') as file:
+            file.write(content)
+        os.replace(partial_path, cache_path)
+    return content
+
+def is_cloudformation_yaml_file(raw_url, log_file, blob_sha=None):
     try:
-        response = SESSION.get(raw_url, timeout=10)
-        if response.status_code != 200:
+        content = read_raw_file(raw_url, blob_sha)
+        if content is None:
             return False
-        content = response.text
 
-        try:
-            yaml_file = yaml.safe_load(content)
-            if isinstance(yaml_file, dict) and "Resources" in yaml_file:
-                for resource in yaml_file["Resources"].values():
-                    if isinstance(resource, dict) and "Type" in resource:
-                        if str(resource["Type"]).startswith("AWS::"):
-                            log(f"\t\tFound CF resource", log_file)
-                            return True
-
-            return False
-
-        except yaml.YAMLError as e:
-            # check if the content starts with "AWSTemplateFormatVersion: 2010-09-09"
-            if content.startswith("AWSTemplateFormatVersion: 2010-09-09"):
-                log(f"\t\tStarts with header", log_file)
-                return True
-            
-            elif "Resources" in content and "AWS::" in content:
-                log(f"\t\tContains AWS resources", log_file)
-                return True
+        result = is_cf_content(content)
+        if result:
+            log(f"\t\tFound CF resource", log_file)
+        return result
 
     except Exception as e:
         log(f"\t\tError checking CloudFormation file: {e}", log_file)
         return False
 
-def check_cf_file(github_client, file_path, log_file, active_dump, months=12):
+def changed_yaml_files(commits, repo_name, log_file):
+    for commit in commits:
+        try:
+            files = commit.files
+        except Exception as e:
+            log(f"\t\t\tError checking files in commit {commit.sha} of {repo_name}: {e}", log_file)
+            continue
+        for file in files:
+            if file.filename.endswith(('.yaml', '.yml')):
+                yield file
+
+def find_cloudformation_file(files, log_file, workers=FETCH_WORKERS):
+    # classify up to `workers` files at once and stop at the first template
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = {}
+    seen = set()
+    try:
+        for file in files:
+            key = file.sha or file.raw_url
+            if key in seen:
+                continue
+            seen.add(key)
+            pending[executor.submit(is_cloudformation_yaml_file, file.raw_url, log_file, file.sha)] = file
+
+            # keep a bounded window of downloads in flight
+            while len(pending) >= workers * 2:
+                found = wait_for_template(pending)
+                if found:
+                    return found
+
+        while pending:
+            found = wait_for_template(pending)
+            if found:
+                return found
+        return None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def wait_for_template(pending):
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    found = None
+    for future in done:
+        file = pending.pop(future)
+        if future.result() and found is None:
+            found = file
+    return found
+
+def check_cf_file(github_client, file_path, log_file, active_dump, months=12, backend="api", workers=FETCH_WORKERS):
     repositories = load_yaml(file_path)
     repositories = extract_repo(repositories)
 
@@ -102,33 +207,31 @@ def check_cf_file(github_client, file_path, log_file, active_dump, months=12):
 
     for repo in repositories:
         repo_name = extract_repo_name(repo)
+        if backend == "local":
+            log(f"\tChecking repository: {repo}", log_file)
+            try:
+                changed_file = check_file_locally(repo, since, log_file, "cf")
+            except Exception as e:
+                log(f"\t\tError checking repository {repo_name}: {e}", log_file)
+                continue
+            if changed_file:
+                log(f"\t\tCloudFormation file changed: {changed_file}", log_file)
+                active_repos.append(repo)
+            else:
+                log(f"\t\tNo CloudFormation files changed in the last {months} months for {repo_name}", log_file)
+            continue
+
         try:
             github_limit(github_client, log_file)
             repository = github_client.get_repo(repo_name)
             log(f"\tChecking repository: {repo}", log_file)
 
-            cf_changed = False
             commits = repository.get_commits(since=since)
-            for commit in commits:
-                try:
-                    files = commit.files
-                    for file in files:
-                        if file.filename.endswith(('.yaml', '.yml')):
-
-                            result = is_cloudformation_yaml_file(file.raw_url, log_file)
-                            if result:
-                                cf_changed = True
-                                active_repos.append(repo)
-                                log(f"\t\tCloudFormation file changed: {file.raw_url}", log_file)
-                                break
-
-                    if cf_changed:
-                        break
-                except Exception as e:
-                    log(f"\t\t\tError checking files in commit {commit.sha} of {repo_name}: {e}", log_file)
-                    continue
-
-            if not cf_changed:
+            cf_file = find_cloudformation_file(changed_yaml_files(commits, repo_name, log_file), log_file, workers)
+            if cf_file:
+                active_repos.append(repo)
+                log(f"\t\tCloudFormation file changed: {cf_file.raw_url}", log_file)
+            else:
                 log(f"\t\tNo CloudFormation files changed in the last {months} months for {repo_name}", log_file)
 
         except Exception as e:
@@ -136,4 +239,5 @@ def check_cf_file(github_client, file_path, log_file, active_dump, months=12):
 
     log(f"\nActive repositories with CloudFormation files changed in the last {months} months: {len(active_repos)}", log_file)
 
+    log_http_cache(log_file)
     save_to_file(active_repos, active_dump)
\ No newline at end of file
@@ -1,10 +1,18 @@
+import re
+import json
+import asyncio
 import datetime
 
 from utils.yaml_utils import load_yaml, save_to_file
 from utils.logger import log
-from utils.github_utils import github_connect, github_limit
+from utils.http_cache import log_http_cache
+from utils.github_utils import github_connect, github_limit, github_tokens
+from utils.github_async import run_with_client, CONCURRENCY
 from utils.usage import extract_repo_name
 
+# repositories per GraphQL request
+GRAPHQL_BATCH_SIZE = 25
+
 def check_active_repos(github_client, repositories, log_file, months=6):
     log(f"Checking {len(repositories)} repositories for activity in the last {months} months...", log_file)
 
@@ -62,10 +70,158 @@ def check_active_repos(github_client, repositories, log_file, months=6):
 
     return active_repos, inactive_repos, error_repos
 
-def find_active(github_client, file_path, log_file, active_dump, inactive_dump, error_dump, months=6):
+def build_activity_query(repo_names, since, commits=True):
+    # three aliased fields per repo; the two searches count issues + PRs (as the REST issues list does) and PRs into main
+    if commits:
+        repository_fields = "defaultBranchRef { target { ... on Commit { history(since: $since) { totalCount } } } }"
+    else:
+        repository_fields = "id"
+    fields = []
+    for i, repo_name in enumerate(repo_names):
+        owner, name = repo_name.split("/")[:2]
+        issues_query = json.dumps(f"repo:{repo_name} updated:>={since}")
+        pulls_query = json.dumps(f"repo:{repo_name} is:pr base:main updated:>={since}")
+        fields.append(f"""
+  r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{
+    {repository_fields}
+  }}
+  i{i}: search(query: {issues_query}, type: ISSUE) {{ issueCount }}
+  p{i}: search(query: {pulls_query}, type: ISSUE) {{ issueCount }}""")
+    variables = "($since: GitTimestamp!)" if commits else ""
+    return f"query{variables} {{" + "".join(fields) + "\n}"
+
+def fetch_activity_graphql(github_client, repositories, log_file, months=6, batch_size=GRAPHQL_BATCH_SIZE, commits=True):
+    # (repo, activity) per repository, activity is None when the repo could not be checked
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=months * 30)
+    since = since.strftime("%Y-%m-%dT%H:%M:%SZ")
+    requester = github_client.requester
+
+    for start in range(0, len(repositories), batch_size):
+        batch = repositories[start:start + batch_size]
+        repo_names = [extract_repo_name(repo) for repo in batch]
+        try:
+            github_limit(github_client, log_file)
+            # not graphql_query(): it raises on the first error, a missing repo must not fail the whole batch
+            _, data = requester.requestJsonAndCheck("POST", requester.graphql_url, input={
+                "query": build_activity_query(repo_names, since, commits),
+                "variables": {"since": since} if commits else {}
+            })
+        except Exception as e:
+            log(f"\tError checking batch starting at {batch[0]}: {e}", log_file)
+            for repo in batch:
+                yield repo, None
+            continue
+
+        results = data.get("data") or {}
+        for i, repo in enumerate(batch):
+            repository = results.get(f"r{i}")
+            if repository is None:
+                log(f"\tError checking repo {repo}: not found or not accessible", log_file)
+                yield repo, None
+                continue
+
+            branch = repository.get("defaultBranchRef") or {}
+            history = (branch.get("target") or {}).get("history") or {}
+            yield repo, {
+                "repo": repo,
+                "commits": history.get("totalCount", 0) if commits else None,
+                "issues": (results.get(f"i{i}") or {}).get("issueCount", 0),
+                "pulls": (results.get(f"p{i}") or {}).get("issueCount", 0)
+            }
+
+def check_active_repos_graphql(github_client, repositories, log_file, months=6, batch_size=GRAPHQL_BATCH_SIZE):
+    log(f"Checking {len(repositories)} repositories for activity in the last {months} months in batches of {batch_size}...", log_file)
+
+    active_repos = []
+    inactive_repos = []
+    error_repos = []
+
+    for repo, activity in fetch_activity_graphql(github_client, repositories, log_file, months, batch_size):
+        if activity is None:
+            error_repos.append(repo)
+            continue
+        log(f"\tChecked repository: {repo} (commits: {activity['commits']}, issues: {activity['issues']}, pulls: {activity['pulls']})", log_file)
+
+        if activity["commits"] or activity["issues"] or activity["pulls"]:
+            active_repos.append(activity)
+        else:
+            inactive_repos.append(repo)
+
+    return active_repos, inactive_repos, error_repos
+
+def last_page(link_header):
+    match = re.search(r'[?&]page=(\d+)[^>]*>; rel="last"', link_header or "")
+    return int(match.group(1)) if match else None
+
+async def count_items(client, url, params):
+    # one item per page: the "last" link is the number of items, as PyGithub's totalCount
+    response = await client.get_json(url, dict(params, per_page=1))
+    page = last_page(response.headers.get("Link"))
+    return page if page is not None else len(response.data)
+
+async def count_recent_pulls(client, repo_name, since):
+    # sorted by last update, so paging stops at the first pull request older than the cutoff
+    count = 0
+    page = 1
+    while True:
+        response = await client.get_json(f"/repos/{repo_name}/pulls", {
+            "state": "all", "sort": "updated", "direction": "desc", "base": "main", "per_page": 100, "page": page
+        })
+        recent = [pull for pull in response.data if pull["updated_at"] >= since]
+        count += len(recent)
+        if len(recent) < 100:
+            return count
+        page += 1
+
+async def check_active_repos_async(client, repositories, log_file, months=6):
+    log(f"Checking {len(repositories)} repositories for activity in the last {months} months with {client.concurrency} concurrent requests...", log_file)
+
+    active_repos = []
+    inactive_repos = []
+    error_repos = []
+
+    # cutoff at midnight: the same URLs all day long, so reruns are answered with 304s
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=months * 30)
+    since = since.strftime("%Y-%m-%dT00:00:00Z")
+
+    async def probe(repo):
+        repo_name = extract_repo_name(repo)
+        return await asyncio.gather(
+            count_items(client, f"/repos/{repo_name}/commits", {"since": since}),
+            count_items(client, f"/repos/{repo_name}/issues", {"state": "all", "since": since}),
+            count_recent_pulls(client, repo_name, since)
+        )
+
+    results = await asyncio.gather(*(probe(repo) for repo in repositories), return_exceptions=True)
+    for repo, result in zip(repositories, results):
+        if isinstance(result, Exception):
+            log(f"\tError checking repo {repo}: {result}", log_file)
+            error_repos.append(repo)
+            continue
+
+        commits, issues, pulls = result
+        log(f"\tChecked repository: {repo} (commits: {commits}, issues: {issues}, pulls: {pulls})", log_file)
+        if commits or issues or pulls:
+            active_repos.append({"repo": repo, "commits": commits, "issues": issues, "pulls": pulls})
+        else:
+            inactive_repos.append(repo)
+
+    log(f"Requests sent: {client.stats['requests']}, answered from cache (304): {client.stats['not_modified']}", log_file)
+    return active_repos, inactive_repos, error_repos
+
+def find_active(github_client, file_path, log_file, active_dump, inactive_dump, error_dump, months=6, backend="rest", concurrency=CONCURRENCY):
     repositories = load_yaml(file_path)
-    active_repos, inactive_repos, error_repos = check_active_repos(github_client, repositories, log_file, months)
+    if backend == "async":
+        active_repos, inactive_repos, error_repos = run_with_client(
+            lambda client: check_active_repos_async(client, repositories, log_file, months),
+            github_tokens(github_client), concurrency
+        )
+    elif backend == "graphql":
+        active_repos, inactive_repos, error_repos = check_active_repos_graphql(github_client, repositories, log_file, months)
+    else:
+        active_repos, inactive_repos, error_repos = check_active_repos(github_client, repositories, log_file, months)
 
+    log_http_cache(log_file)
     save_to_file(active_repos, active_dump)
     save_to_file(inactive_repos, inactive_dump)
     save_to_file(error_repos, error_dump)
\ No newline at end of file
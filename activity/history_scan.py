@@ -0,0 +1,122 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.logger import log
+from utils.yaml_utils import load_yaml, save_to_file
+from utils.git_utils import read_blob, GitError
+from utils.cf_utils import is_cf_content
+from activity.local_history import local_history, history_log
+from activity.active_repo import fetch_activity_graphql
+from activity.active_file import with_average_activity
+from activity.keywords import build_keyword_pattern, match_keywords
+
+# history clones running at the same time
+SCAN_WORKERS = 4
+IAC_SUFFIXES = {"tf": (".tf",), "cf": (".yaml", ".yml")}
+
+def is_iac_change(history_dir, file_type, blob, path, checked, log_file):
+    if not path.endswith(IAC_SUFFIXES[file_type]):
+        return False
+    if file_type == "tf":
+        return True
+    # the same blob is usually touched by many commits, classify it once
+    if blob in checked:
+        return False
+    checked.add(blob)
+    try:
+        return is_cf_content(read_blob(history_dir, blob))
+    except GitError as e:
+        log(f"\t\t\tError reading {path}: {e}", log_file)
+        return False
+
+def scan_repo(repo, file_type, cutoffs, pattern, log_file):
+    # one history clone and one walk over it answer the commit, IaC and keyword questions together
+    scan = {"commits": 0, "changed_file": None, "keywords": set()}
+    since = min(cutoffs.values())
+    with local_history(repo, since, log_file) as history_dir:
+        if history_dir is None:
+            return scan
+
+        checked = set()
+        for sha, timestamp, message, changes in history_log(history_dir, since):
+            commit_time = datetime.datetime.fromtimestamp(timestamp)
+            if commit_time >= cutoffs["repo"]:
+                scan["commits"] += 1
+
+            if scan["changed_file"] is None and commit_time >= cutoffs["file"]:
+                for status, blob, path in changes:
+                    # a deleted .tf file counts, as in the API backend; a deleted template cannot be classified
+                    if (status in "AM" or (status == "D" and file_type == "tf")) and is_iac_change(history_dir, file_type, blob, path, checked, log_file):
+                        scan["changed_file"] = path
+                        break
+
+            # as search_keywords: the newest commit that changes .tf files and mentions a keyword
+            if not scan["keywords"] and commit_time >= cutoffs["keywords"] and any(path.endswith(".tf") for _, _, path in changes):
+                scan["keywords"] = match_keywords(message, pattern)
+                for keyword in scan["keywords"]:
+                    log(f"\t\tFound keyword '{keyword}' in commit: {repo.rstrip('/')}/commit/{sha}", log_file)
+    return scan
+
+def scan_activity(github_client, file_path, file_type, log_file, outputs, repo_months=6, file_months=12, keyword_months=12,
+                  word_boundaries=False, workers=SCAN_WORKERS):
+    # writes what find_active, check_tf_file/check_cf_file and search_keywords write, from one pass per repository
+    repositories = load_yaml(file_path)
+    now = datetime.datetime.now()
+    cutoffs = {
+        "repo": now - datetime.timedelta(days=30 * repo_months),
+        "file": now - datetime.timedelta(days=30 * file_months),
+        "keywords": now - datetime.timedelta(days=30 * keyword_months)
+    }
+    pattern = build_keyword_pattern(word_boundaries=word_boundaries)
+    log(f"Scanning {len(repositories)} repositories: activity in the last {repo_months} months, "
+        f"{file_type} files and keywords in the last {file_months}/{keyword_months} months...", log_file)
+
+    # commits come from the local walk, GraphQL is only asked for issues and pull requests
+    activities = dict(fetch_activity_graphql(github_client, repositories, log_file, repo_months, commits=False))
+    found = [repo for repo in repositories if activities.get(repo) is not None]
+
+    def scan(repo):
+        try:
+            return scan_repo(repo, file_type, cutoffs, pattern, log_file)
+        except Exception as e:
+            log(f"\tError scanning repo {repo}: {e}", log_file)
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        scans = dict(zip(found, executor.map(scan, found)))
+
+    active_repos, inactive_repos, error_repos = [], [], []
+    active_files, keyword_repos, no_keyword_repos = [], [], []
+    for repo in repositories:
+        activity, scan = activities.get(repo), scans.get(repo)
+        if activity is None or scan is None:
+            error_repos.append(repo)
+            continue
+
+        activity["commits"] = scan["commits"]
+        log(f"\tChecked repository: {repo} (commits: {activity['commits']}, issues: {activity['issues']}, pulls: {activity['pulls']})", log_file)
+        if not (activity["commits"] or activity["issues"] or activity["pulls"]):
+            inactive_repos.append(repo)
+            continue
+        active_repos.append(activity)
+
+        if not scan["changed_file"]:
+            log(f"\t\tNo {file_type} files changed in the last {file_months} months for {repo}", log_file)
+            continue
+        log(f"\t\tFile changed: {scan['changed_file']}", log_file)
+        entry = with_average_activity(activity)
+        active_files.append(entry)
+
+        if scan["keywords"]:
+            keyword_repos.append(dict(entry, keywords=list(scan["keywords"])))
+        else:
+            no_keyword_repos.append(entry)
+
+    log(f"Active: {len(active_repos)}, inactive: {len(inactive_repos)}, errors: {len(error_repos)}, "
+        f"with {file_type} changes: {len(active_files)}, with keywords: {len(keyword_repos)}", log_file)
+    save_to_file(active_repos, outputs["active_repos"])
+    save_to_file(inactive_repos, outputs["inactive_repos"])
+    save_to_file(error_repos, outputs["error_repos"])
+    save_to_file(active_files, outputs["active_files"])
+    save_to_file(keyword_repos, outputs["keywords"])
+    save_to_file(no_keyword_repos, outputs["no_keywords"])
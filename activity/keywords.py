@@ -1,14 +1,59 @@
 from github import Github
+import re
 import datetime
+from collections import namedtuple
 
 from utils.yaml_utils import load_yaml, save_to_file
 from utils.github_utils import github_limit
 from utils.logger import log
+from utils.http_cache import log_http_cache
 from utils.usage import extract_repo_name
+from activity.local_history import local_history, commit_log
 
 KEYWORDS = ['bill', 'cheap', 'cost', 'efficient', 'expens', 'pay', 'overprovisioned', 'PAY_PER_REQUEST', 'r/w', 'lifecycle', 'old generation']
+# with word boundaries, these may still be the start of a longer word ("billing", "costs", "expensive")
+KEYWORD_STEMS = {'bill', 'cheap', 'cost', 'efficient', 'expens', 'lifecycle', 'old generation'}
+MAX_COMMITS = 10000
+
+KeywordPattern = namedtuple('KeywordPattern', ['find', 'at', 'keywords'])
+
+def build_keyword_pattern(keywords=KEYWORDS, word_boundaries=False):
+    # "find" locates every position where some keyword starts, zero-width so overlapping matches are not skipped;
+    # "at" then names all keywords starting there ("pay" and "PAY_PER_REQUEST"), as one search per keyword would
+    parts = []
+    for keyword in keywords:
+        part = re.escape(keyword)
+        if word_boundaries:
+            part = r'\b' + part + ('' if keyword in KEYWORD_STEMS else r'\b')
+        parts.append(part)
+    find = re.compile('(?=' + '|'.join(parts) + ')', re.IGNORECASE)
+    at = re.compile(''.join(f'(?:(?=(?P<k{i}>{part})))?' for i, part in enumerate(parts)), re.IGNORECASE)
+    return KeywordPattern(find, at, list(keywords))
+
+def match_keywords(message, pattern):
+    found = set()
+    for match in pattern.find.finditer(message):
+        groups = pattern.at.match(message, match.start()).groupdict()
+        found.update(pattern.keywords[int(name[1:])] for name, value in groups.items() if value is not None)
+    return found
+
+def search_keywords_locally(repo_url, pattern, since, log_file):
+    # history-only clone, then a single pass over the messages of commits that touched .tf files
+    depth = MAX_COMMITS if since is None else None
+    with local_history(repo_url, since, log_file, depth) as history_dir:
+        if history_dir is None:
+            return set()
+        for sha, message, paths in commit_log(history_dir, since, MAX_COMMITS):
+            if not any(path.endswith('.tf') for path in paths):
+                continue
+            found_keywords = match_keywords(message, pattern)
+            for keyword in found_keywords:
+                log(f"\t\tFound keyword '{keyword}' in commit: {repo_url.rstrip('/')}/commit/{sha}", log_file)
+            if found_keywords:
+                return found_keywords
+    return set()
 
-def search_keywords(github_client, file_path, log_file, keywords_file, no_keywords_file, search="commits", months=12):
+def search_keywords(github_client, file_path, log_file, keywords_file, no_keywords_file, search="commits", months=12, backend="api", word_boundaries=False):
 
     if search == "commits":
         log(f"Searching for keywords in the last 10,000 commits", log_file)
@@ -20,10 +65,26 @@ def search_keywords(github_client, file_path, log_file, keywords_file, no_keywor
     since = datetime.datetime.now() - datetime.timedelta(days=30 * months)
     keyword_repos = []
     no_keyword_repos = []
+    pattern = build_keyword_pattern(KEYWORDS, word_boundaries)
 
     for repo in repositories:
         repo_url = repo["repo"]
         repo_name = extract_repo_name(repo_url)
+        if backend == "local":
+            log(f"\tProcessing repo: {repo_url}", log_file)
+            try:
+                found_keywords = search_keywords_locally(repo_url, pattern, since if search != "commits" else None, log_file)
+            except Exception as e:
+                log(f"\tError processing repo {repo_name}: {e}", log_file)
+                continue
+            if found_keywords:
+                repo["keywords"] = list(found_keywords)
+                keyword_repos.append(repo)
+            else:
+                no_keyword_repos.append(repo)
+                log(f"\t\tNo keywords found in repo: {repo_name}", log_file)
+            continue
+
         try:
             github_limit(github_client, log_file)
             log(f"\tProcessing repo: {repo_url}", log_file)
@@ -36,7 +97,7 @@ def search_keywords(github_client, file_path, log_file, keywords_file, no_keywor
 
             found_keywords = set()
             for i, commit in enumerate(commits):
-                if i >= 10000:
+                if i >= MAX_COMMITS:
                     break
 
                 try:
@@ -50,11 +111,9 @@ def search_keywords(github_client, file_path, log_file, keywords_file, no_keywor
                 if not any(f.endswith('.tf') for f in files_changed):
                     continue
 
-                commit_message = commit.commit.message.lower()
-                for keyword in KEYWORDS:
-                    if keyword in commit_message:
-                        found_keywords.add(keyword)
-                        log(f"\t\tFound keyword '{keyword}' in commit: {commit.html_url}", log_file)
+                for keyword in match_keywords(commit.commit.message, pattern):
+                    found_keywords.add(keyword)
+                    log(f"\t\tFound keyword '{keyword}' in commit: {commit.html_url}", log_file)
 
                 # As soon as we find at least one keyword in a commit that changes .tf files, we can stop
                 if found_keywords:
@@ -71,5 +130,6 @@ def search_keywords(github_client, file_path, log_file, keywords_file, no_keywor
             log(f"\tError processing repo {repo_name}: {e}", log_file)
 
     log(f"Found {len(keyword_repos)} repos with keywords and {len(no_keyword_repos)} without keywords.", log_file)
+    log_http_cache(log_file)
     save_to_file(keyword_repos, keywords_file)
     save_to_file(no_keyword_repos, no_keywords_file)
@@ -0,0 +1,90 @@
+import tempfile
+from contextlib import contextmanager
+
+from utils.logger import log
+from utils.git_utils import fetch_history, read_blob, remove_dir, run_git, GitError
+from utils.cf_utils import is_cf_content
+
+TF_PATTERNS = ['*.tf']
+CF_PATTERNS = ['*.yaml', '*.yml']
+NULL_BLOB = '0' * 40
+
+@contextmanager
+def local_history(repo_url, since, log_file, depth=None):
+    # yields None when the repo has no commit since the cutoff
+    history_dir = tempfile.mkdtemp(prefix="history_")
+    try:
+        try:
+            fetch_history(repo_url, history_dir, since, depth)
+        except GitError as e:
+            if "no commits selected" not in str(e):
+                raise
+            log(f"\t\tNo commits since {since:%Y-%m-%d} for {repo_url}", log_file)
+            yield None
+            return
+        yield history_dir
+    finally:
+        remove_dir(history_dir)
+
+# rename detection compares file contents, which a blobless clone downloads one by one; without it
+# a rename is listed as a delete plus an add
+NO_RENAMES = '--no-renames'
+
+def changed_files(history_dir, since, patterns):
+    # (commit, blob, path) for every added, modified or deleted file matching the patterns, newest first;
+    # the API counts deletions as changes too, their blob is all zeros
+    output = run_git(['--git-dir', history_dir, 'log', f'--since={since:%Y-%m-%d %H:%M:%S}', '--format=%x00%H',
+                      '--raw', '--no-abbrev', NO_RENAMES, '--diff-filter=AMD', '--'] + patterns)
+    commit = None
+    for line in output.splitlines():
+        if line.startswith('\x00'):
+            commit = line[1:]
+        elif line.startswith(':'):
+            meta, path = line.split('\t', 1)
+            blob = meta.split()[3]
+            yield commit, blob, path.split('\t')[-1]
+
+def commit_log(history_dir, since=None, max_count=None):
+    # (sha, message, changed paths) per commit, newest first
+    args = ['--git-dir', history_dir, 'log', '--format=%x1e%H%x1f%B%x1f', '--name-only', NO_RENAMES]
+    if since is not None:
+        args.append(f'--since={since:%Y-%m-%d %H:%M:%S}')
+    if max_count is not None:
+        args.append(f'--max-count={max_count}')
+    for record in run_git(args).split('\x1e')[1:]:
+        sha, message, paths = record.split('\x1f', 2)
+        yield sha, message, [path for path in paths.splitlines() if path]
+
+def history_log(history_dir, since):
+    # (sha, commit time, message, [(status, blob, path)]) per commit, newest first, merges without changes
+    output = run_git(['--git-dir', history_dir, 'log', f'--since={since:%Y-%m-%d %H:%M:%S}',
+                      '--format=%x1e%H%x1f%ct%x1f%B%x1f', '--raw', '--no-abbrev', NO_RENAMES])
+    for record in output.split('\x1e')[1:]:
+        sha, timestamp, message, raw = record.split('\x1f', 3)
+        changes = []
+        for line in raw.splitlines():
+            if line.startswith(':'):
+                meta, path = line.split('\t', 1)
+                fields = meta.split()
+                changes.append((fields[4][0], fields[3], path.split('\t')[-1]))
+        yield sha, int(timestamp), message, changes
+
+def find_changed_tf_file(history_dir, since):
+    for _, _, path in changed_files(history_dir, since, TF_PATTERNS):
+        return path
+    return None
+
+def find_changed_cf_file(history_dir, since, log_file):
+    checked = set()
+    for commit, blob, path in changed_files(history_dir, since, CF_PATTERNS):
+        # a deleted file has no content to classify, the API's raw download of it fails as well;
+        # the same blob is usually touched by many commits, classify it once
+        if blob == NULL_BLOB or blob in checked:
+            continue
+        checked.add(blob)
+        try:
+            if is_cf_content(read_blob(history_dir, blob)):
+                return path
+        except GitError as e:
+            log(f"\t\t\tError reading {path} at {commit}: {e}", log_file)
+    return None
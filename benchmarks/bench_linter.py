@@ -0,0 +1,125 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import datetime
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.fixtures import SIZES, create_fixtures
+from checkov_check.run_linter import lint_repo_in_workspace, LINT_MODES, CLONE_MODES, CHECKS_CLONE_PATH
+from utils.metrics import summarize_metrics
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    scale = 1024 if sys.platform == 'darwin' else 1
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale
+    return max(own, children)
+
+def get_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def run_scenario(urls, tool, log_file, mode, clone_mode, workers, mirrors_dir):
+    entries = [{'repo': url} for url in urls]
+    # no cache and no checks hash: every repo is cloned and linted
+    params = (tool, log_file, mode, None, None, clone_mode, mirrors_dir)
+
+    start = time.monotonic()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lint_repo_in_workspace, entries, *[[param] * len(entries) for param in params]))
+    else:
+        results = [lint_repo_in_workspace(entry, *params) for entry in entries]
+    elapsed = time.monotonic() - start
+
+    metrics = [metrics for _, metrics in results]
+    failed = {}
+    for entry, _ in results:
+        for check in entry.get('checks', {}).get('failed_checks', []):
+            failed[check['check_id']] = failed.get(check['check_id'], 0) + 1
+
+    return {
+        'repos': len(entries),
+        'seconds': round(elapsed, 3),
+        'repos_per_minute': round(len(entries) / elapsed * 60, 2) if elapsed else None,
+        'failed_checks': failed,
+        'summary': summarize_metrics(metrics),
+    }
+
+def run_benchmark(sizes, repos_per_size, mode, clone_mode, workers, use_mirrors, keep=False):
+    root = tempfile.mkdtemp(prefix='bench_linter_')
+    log_file = os.path.join(root, 'logs.txt')
+    mirrors_dir = os.path.join(root, 'mirrors') if use_mirrors else None
+    cwd = os.getcwd()
+    results = []
+    try:
+        for kind, tool in (('tf', 'extended_tf'), ('cf', 'extended_cf')):
+            for size in sizes:
+                urls = create_fixtures(os.path.join(root, 'repos'), [size], repos_per_size, kind)
+                # workspaces are created relative to the working directory
+                os.chdir(root)
+                try:
+                    scenario = run_scenario(urls, tool, log_file, mode, clone_mode, workers, mirrors_dir)
+                finally:
+                    os.chdir(cwd)
+                scenario.update({'tool': tool, 'size': size})
+                results.append(scenario)
+                print(f"{tool:12} {size:7} {scenario['repos_per_minute']} repos/min, {scenario['seconds']}s")
+    finally:
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'revision': get_revision(),
+        'config': {
+            'sizes': sizes,
+            'repos_per_size': repos_per_size,
+            'mode': mode,
+            'clone_mode': clone_mode,
+            'workers': workers,
+            'mirrors': use_mirrors,
+        },
+        'peak_rss_kb': peak_rss_kb(),
+        'scenarios': results,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the linting pipeline on generated local repositories.")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["small", "medium"])
+    parser.add_argument("--repos", type=int, default=5, help="repositories generated per size")
+    parser.add_argument("--mode", choices=LINT_MODES, default="file")
+    parser.add_argument("--clone", choices=CLONE_MODES, default="full")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--mirrors", action="store_true", help="clone through a local mirror cache")
+    parser.add_argument("--keep", action="store_true", help="keep the generated repositories and logs")
+    parser.add_argument("--output", help="where to write the JSON results (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(CHECKS_CLONE_PATH):
+        print(f"{CHECKS_CLONE_PATH} not found, only Checkov's built-in CKV2_AWS_61 will report findings.")
+    report = run_benchmark(args.sizes, args.repos, args.mode, args.clone, args.workers, args.mirrors, args.keep)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, datetime.datetime.now().strftime('%Y%m%d_%H%M%S') + '.json')
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"Results saved to {output}")
@@ -0,0 +1,206 @@
+import os
+import subprocess
+
+# every check gets one resource that fails it and one that passes it
+TF_FIXTURES = {
+    's3.tf': '''resource "aws_s3_bucket" "no_lifecycle_{n}" {{
+  bucket = "no-lifecycle-{n}"
+}}
+
+resource "aws_s3_bucket" "inline_lifecycle_{n}" {{
+  bucket = "inline-lifecycle-{n}"
+
+  lifecycle_rule {{
+    enabled = true
+    expiration {{
+      days = 30
+    }}
+  }}
+}}
+
+resource "aws_s3_bucket" "linked_lifecycle_{n}" {{
+  bucket = "linked-lifecycle-{n}"
+}}
+''',
+    # the lifecycle configuration lives in a sibling file, only a module or repo pass links it
+    's3_lifecycle.tf': '''resource "aws_s3_bucket_lifecycle_configuration" "linked_{n}" {{
+  bucket = aws_s3_bucket.linked_lifecycle_{n}.id
+
+  rule {{
+    id     = "expire"
+    status = "Enabled"
+    expiration {{
+      days = 30
+    }}
+  }}
+}}
+''',
+    'dynamodb.tf': '''resource "aws_dynamodb_table" "provisioned_{n}" {{
+  name           = "provisioned-{n}"
+  billing_mode   = "PROVISIONED"
+  read_capacity  = 5
+  write_capacity = 5
+  hash_key       = "id"
+
+  attribute {{
+    name = "id"
+    type = "S"
+  }}
+
+  attribute {{
+    name = "owner"
+    type = "S"
+  }}
+
+  global_secondary_index {{
+    name            = "owner-index"
+    hash_key        = "owner"
+    projection_type = "ALL"
+    read_capacity   = 5
+    write_capacity  = 5
+  }}
+}}
+
+resource "aws_dynamodb_table" "on_demand_{n}" {{
+  name         = "on-demand-{n}"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "id"
+
+  attribute {{
+    name = "id"
+    type = "S"
+  }}
+}}
+''',
+    'compute.tf': '''resource "aws_instance" "old_{n}" {{
+  ami           = "ami-12345678"
+  instance_type = "t2.micro"
+}}
+
+resource "aws_instance" "current_{n}" {{
+  ami           = "ami-12345678"
+  instance_type = "t3.micro"
+}}
+
+resource "aws_ebs_volume" "old_{n}" {{
+  availability_zone = "eu-west-1a"
+  size              = 10
+  type              = "gp2"
+}}
+
+resource "aws_ebs_volume" "current_{n}" {{
+  availability_zone = "eu-west-1a"
+  size              = 10
+  type              = "gp3"
+}}
+''',
+}
+
+CF_FIXTURES = {
+    'template.yml': '''AWSTemplateFormatVersion: 2010-09-09
+Description: benchmark fixture {n}
+Resources:
+  NoLifecycleBucket:
+    Type: AWS::S3::Bucket
+    Properties:
+      BucketName: !Sub "${{AWS::StackName}}-no-lifecycle-{n}"
+  LifecycleBucket:
+    Type: AWS::S3::Bucket
+    Properties:
+      LifecycleConfiguration:
+        Rules:
+          - Id: expire
+            Status: Enabled
+            ExpirationInDays: 30
+  ProvisionedTable:
+    Type: AWS::DynamoDB::Table
+    Properties:
+      BillingMode: PROVISIONED
+      AttributeDefinitions:
+        - AttributeName: id
+          AttributeType: S
+      KeySchema:
+        - AttributeName: id
+          KeyType: HASH
+      ProvisionedThroughput:
+        ReadCapacityUnits: 5
+        WriteCapacityUnits: 5
+  OnDemandTable:
+    Type: AWS::DynamoDB::Table
+    Properties:
+      BillingMode: PAY_PER_REQUEST
+      AttributeDefinitions:
+        - AttributeName: id
+          AttributeType: S
+      KeySchema:
+        - AttributeName: id
+          KeyType: HASH
+  OldInstance:
+    Type: AWS::EC2::Instance
+    Properties:
+      ImageId: !Ref ImageId
+      InstanceType: t2.micro
+  CurrentInstance:
+    Type: AWS::EC2::Instance
+    Properties:
+      ImageId: !Ref ImageId
+      InstanceType: t3.micro
+''',
+}
+
+# YAML that must not be classified as CloudFormation
+NOISE_YAML = '''name: ci-{n}
+on: [push]
+jobs:
+  build:
+    runs-on: ubuntu-latest
+    steps:
+      - uses: actions/checkout@v4
+'''
+
+# files per repository size
+SIZES = {
+    'small': {'modules': 2, 'filler': 10},
+    'medium': {'modules': 20, 'filler': 200},
+    'large': {'modules': 100, 'filler': 2000},
+}
+
+FILLER_BYTES = 4096
+
+def git(args, cwd):
+    subprocess.run(['git'] + args, cwd=cwd, check=True, capture_output=True)
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write(content)
+
+def create_repo(path, size, kind):
+    spec = SIZES[size]
+    fixtures = TF_FIXTURES if kind == 'tf' else CF_FIXTURES
+
+    for n in range(spec['modules']):
+        module_dir = os.path.join(path, 'modules', f'module_{n}')
+        for name, template in fixtures.items():
+            write_file(os.path.join(module_dir, name), template.format(n=n))
+        write_file(os.path.join(module_dir, 'workflow.yml'), NOISE_YAML.format(n=n))
+
+    for n in range(spec['filler']):
+        write_file(os.path.join(path, 'src', f'pkg_{n % 20}', f'file_{n}.txt'), f'{n}\n' * (FILLER_BYTES // 4))
+
+    git(['init', '-q'], path)
+    # file:// clones may only use --filter if the serving repo allows it
+    git(['config', 'uploadpack.allowFilter', 'true'], path)
+    git(['add', '-A'], path)
+    git(['-c', 'user.name=bench', '-c', 'user.email=bench@localhost', 'commit', '-q', '-m', 'fixture'], path)
+    url_path = os.path.abspath(path).replace(os.sep, '/')
+    if not url_path.startswith('/'):
+        url_path = '/' + url_path
+    return 'file://' + url_path
+
+def create_fixtures(root, sizes, repos_per_size, kind):
+    urls = []
+    for size in sizes:
+        for i in range(repos_per_size):
+            urls.append(create_repo(os.path.join(root, f'{kind}_{size}_{i}'), size, kind))
+    return urls
@@ -1,10 +1,5 @@
-import requests
-
-from utils.logger import log
 from utils.yaml_utils import save_to_file, load_yaml
 
-LOG_PATH = 'logs.txt'
-
 BASELINE_TF_INPUT = 'results/baseline_tf/checkov/results.yml'
 BASELINE_TF_OUTPUT = 'results/baseline_tf/checkov/results_full_link.yml'
 
@@ -17,16 +12,11 @@ EXTENDED_TF_OUTPUT = 'results/extended_tf/checkov/results_full_link.yml'
 EXTENDED_CF_INPUT = 'results/extended_cf/checkov/results.yml'
 EXTENDED_CF_OUTPUT = 'results/extended_cf/checkov/results_full_link.yml'
 
-def get_default_branch(repo_url):
-    try:
-        owner_repo = "/".join(repo_url.split("github.com/")[1].split("/")[:2])
-        api_url = f"https://api.github.com/repos/{owner_repo}"
-        response = requests.get(api_url)
-        if response.status_code == 200:
-            return response.json().get("default_branch", "main")
-    except Exception:
-        log(f"Error fetching default branch for {repo_url}")
-    return "main"
+def build_permalink(file_link, line_range):
+    if not line_range:
+        return file_link
+    start, _, end = str(line_range).partition("-")
+    return f"{file_link}#L{start}-L{end or start}"
 
 def replace_file_paths_with_links(tool):
     if tool == "baseline_tf":
@@ -44,9 +34,10 @@ def replace_file_paths_with_links(tool):
 
     data = load_yaml(input_file)
 
+    # links are pinned to the commit run_linter checked out, no GitHub API calls needed
     for repo_entry in data:
-        repo_url = repo_entry.get("repo")
-        default_branch = get_default_branch(repo_url)
+        repo_url = repo_entry.get("repo").rstrip("/")
+        ref = repo_entry.get("commit") or repo_entry.get("branch") or "HEAD"
 
         for section in ("failed_checks", "passed_checks"):
             checks = repo_entry.get("checks", {}).get(section, [])
@@ -55,10 +46,12 @@ def replace_file_paths_with_links(tool):
                 # delete the "temp_repo" prefix if it exists
                 if raw_path.startswith("temp_repo/"):
                     raw_path = raw_path.replace("temp_repo/", "", 1)
-                    
-                full_url = f"{repo_url}/blob/{default_branch}/{raw_path}"
 
+                full_url = f"{repo_url}/blob/{ref}/{raw_path}"
+
+                # file_path stays one link per file, so files can still be counted on it
                 check["file_path"] = full_url
-    
+                check["permalink"] = build_permalink(full_url, check.get("file_line_range"))
+
     save_to_file(data, output_file)
     
\ No newline at end of file
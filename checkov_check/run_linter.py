@@ -1,9 +1,13 @@
 import os
-import yaml
+import json
+import hashlib
 import shutil
 import stat
+import time
+import argparse
+import tempfile
 from subprocess import Popen
-from threading import Thread
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from git import Repo as GitRepo
 from checkov.terraform.runner import Runner as TfRunner
 from checkov.cloudformation.runner import Runner as CfRunner
@@ -11,6 +15,9 @@ from checkov.runner_filter import RunnerFilter
 
 from utils.logger import log
 from utils.yaml_utils import load_yaml, save_to_file
+from utils.git_utils import get_remote_head, get_checkout_info, clone_repo, GitError, GitTimeout
+from utils.cf_utils import is_cf_file
+from utils.metrics import timed, append_metrics, load_metrics, summarize_metrics
 
 REPO_CHECK_FILES = 'https://github.com/search-rug/iac-cost-linter'
 
@@ -38,14 +45,31 @@ RESULTS_BASELINE_CF = 'results/baseline_cf/checkov/results.yml'
 RESULTS_EXTENDED_TF = 'results/extended_tf/checkov/results.yml'
 RESULTS_EXTENDED_CF = 'results/extended_cf/checkov/results.yml'
 
+CACHE_BASELINE_TF = 'results/baseline_tf/checkov/cache.yml'
+CACHE_BASELINE_CF = 'results/baseline_cf/checkov/cache.yml'
+CACHE_EXTENDED_TF = 'results/extended_tf/checkov/cache.yml'
+CACHE_EXTENDED_CF = 'results/extended_cf/checkov/cache.yml'
+
+# every worker clones into its own directory under here, so repos never share a checkout
+WORKSPACES_DIR = 'workspaces'
+
+# full: regular shallow clone, sparse: blobless clone that only checks out the IaC files
+CLONE_MODES = ['full', 'sparse']
+# hung clones are killed after 30 minutes
+CLONE_TIMEOUT = 1800
+
+# file: one Checkov run per file, module: one run per directory, repo: one run per repository
+LINT_MODES = ['file', 'module', 'repo']
+RUNNER_FILTERS = {}
+
 def force_remove_readonly(func, path, _):
     os.chmod(path, stat.S_IWRITE)
     func(path)
 
-def delete_repo(log_file):
-    if os.path.exists("temp_repo"):
+def delete_repo(log_file, repo_dir="temp_repo"):
+    if os.path.exists(repo_dir):
         try:
-            shutil.rmtree("temp_repo", onerror=force_remove_readonly)
+            shutil.rmtree(repo_dir, onerror=force_remove_readonly)
         except PermissionError as e:
             log("Permission denied." + str(e), log_file)
         except FileNotFoundError:
@@ -53,50 +77,26 @@ def delete_repo(log_file):
         except Exception as e:
             log("Other error:" + str(e), log_file)
 
-def cloneRepoThread(repoUrl, log_file):
-    try:
-        delete_repo(log_file)
-        log(f"\tCloning repository {repoUrl}", log_file)
-        GitRepo.clone_from(repoUrl, "temp_repo", depth=1)
-        log(f"\t\tCloned repository {repoUrl}", log_file)
-    except Exception as e:
-        log(f"\t\tError cloning repository {repoUrl}: {e}", log_file)
+def get_dir_size(path):
+    size = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            file_path = os.path.join(root, file)
+            if not os.path.islink(file_path):
+                size += os.path.getsize(file_path)
+    return size
 
-def find_terraform_files():
+def find_terraform_files(repo_dir="temp_repo"):
     terraform_files = []
-    for root, _, files in os.walk("temp_repo"):
+    for root, _, files in os.walk(repo_dir):
         for file in files:
             if file.endswith('.tf'):
                 terraform_files.append(os.path.join(root, file))
     return terraform_files
 
-def is_cf_file(file_path):
-    try:
-        with open(file_path, 'r') as file:
-            content = file.read()
-            try:
-                yaml_file = yaml.safe_load(content)
-                if isinstance(yaml_file, dict) and "Resources" in yaml_file:
-                    for resource in yaml_file["Resources"].values():
-                        if isinstance(resource, dict) and "Type" in resource:
-                            if str(resource["Type"]).startswith("AWS::"):
-                                return True
-                            
-                return False
-
-            except yaml.YAMLError as e:
-                # check if the content starts with "AWSTemplateFormatVersion: 2010-09-09"
-                if content.startswith("AWSTemplateFormatVersion: 2010-09-09"):
-                    return True
-                
-                elif "Resources" in content and "AWS::" in content:
-                    return True
-    except Exception as e:
-        return False
-
-def find_cf_files():
+def find_cf_files(repo_dir="temp_repo"):
     cf_files = []
-    for root, _, files in os.walk("temp_repo"):
+    for root, _, files in os.walk(repo_dir):
         for file in files:
             if file.endswith('.yaml') or file.endswith('.yml'):
                 file_path = os.path.join(root, file)
@@ -117,143 +117,308 @@ def serialize_check(check_list):
         serialized_checks.append(serialized_check)
     return serialized_checks
 
-def run_linter(tool):
+def prepare_runner(runner_class, checks, checks_dir):
+    # the filter is built once per process and the external checks are only loaded by the first run,
+    # the registries keep them for every later run
+    if runner_class not in RUNNER_FILTERS:
+        RUNNER_FILTERS[runner_class] = RunnerFilter(checks=checks)
+        return RUNNER_FILTERS[runner_class], [checks_dir]
+    return RUNNER_FILTERS[runner_class], None
+
+def run_pass(runner_class, checks, checks_dir, root_folder=None, files=None):
+    runner_filter, external_checks_dir = prepare_runner(runner_class, checks, checks_dir)
+    # runners keep the parsed definitions of their last run, so every pass gets a fresh one
+    runner = runner_class()
+    return runner.run(root_folder=root_folder, files=files, runner_filter=runner_filter, external_checks_dir=external_checks_dir)
+
+def attribute_checks(report, workspace, root_dir):
+    # keep paths relative to the workspace, so they always start with "temp_repo/"
+    for check in report.passed_checks + report.failed_checks:
+        abs_path = getattr(check, 'file_abs_path', None) or os.path.join(root_dir, check.file_path.lstrip('/\\'))
+        check.file_path = os.path.relpath(abs_path, workspace)
+
+def run_checks(files, runner_class, checks, checks_dir, workspace, log_file, mode='file'):
+    passed_checks = []
+    failed_checks = []
+    repo_dir = os.path.join(workspace, "temp_repo")
+
+    if mode == 'file':
+        batches = [[file] for file in files]
+    elif mode == 'module':
+        modules = {}
+        for file in files:
+            modules.setdefault(os.path.dirname(file), []).append(file)
+        batches = list(modules.values())
+    else:
+        batches = [files]
+
+    for batch in batches:
+        try:
+            if mode == 'repo' and runner_class is TfRunner:
+                # a root_folder pass lets graph checks (e.g. CKV2_AWS_61) see resources in sibling files
+                report = run_pass(runner_class, checks, checks_dir, root_folder=repo_dir)
+                attribute_checks(report, workspace, repo_dir)
+            elif mode == 'file':
+                report = run_pass(runner_class, checks, checks_dir, files=batch)
+                relative_path = os.path.relpath(batch[0], workspace)
+                for check in report.passed_checks + report.failed_checks:
+                    check.file_path = relative_path
+            else:
+                report = run_pass(runner_class, checks, checks_dir, files=batch)
+                attribute_checks(report, workspace, repo_dir)
+
+            passed_checks.extend(report.passed_checks)
+            failed_checks.extend(report.failed_checks)
+
+        except Exception as e:
+            log(f"\t\tError running checks on {batch[0] if len(batch) == 1 else repo_dir}: {e}", log_file)
+            continue
+
+    return passed_checks, failed_checks
+
+def get_checks_hash(checks, checks_dir, mode):
+    digest = hashlib.sha256(",".join(sorted(checks)).encode())
+    digest.update(mode.encode())
+    # include the check sources, so editing a check also invalidates the cache
+    for root, dirs, files in os.walk(checks_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if file.endswith('.py'):
+                with open(os.path.join(root, file), 'rb') as check_file:
+                    digest.update(check_file.read())
+    return digest.hexdigest()
+
+def lint_repo(entry, tool, log_file, workspace=".", mode='file', cached=None, checks_hash=None, clone_mode='full', metrics=None, mirrors_dir=None):
+    repo = entry['repo']
+    repo_dir = os.path.join(workspace, "temp_repo")
+    if metrics is None:
+        metrics = {}
+    metrics.update({'repo': repo, 'cached': False, 'files': 0, 'bytes_cloned': 0, 'passed': 0, 'failed': 0})
+
+    log(f"Processing repository: {repo}", log_file, repo=repo, stage="lint")
+    head = None
+    if checks_hash is not None:
+        with timed(metrics, 'resolve_head'):
+            try:
+                head = get_remote_head(repo)
+            except Exception as e:
+                log(f"\t\tError resolving HEAD of {repo}: {e}", log_file, level="ERROR", repo=repo, stage="lint")
+
+        if head and cached and cached['commit'] == head and cached['checks_hash'] == checks_hash:
+            log(f"\t\tRepository {repo} unchanged since the last run ({head}), reusing its checks.", log_file, repo=repo, stage="lint")
+            if cached.get('checks') is not None:
+                entry['checks'] = cached['checks']
+            entry['commit'] = head
+            entry['branch'] = cached.get('branch')
+            metrics['cached'] = True
+            return entry
+
+    with timed(metrics, 'cleanup'):
+        delete_repo(log_file, repo_dir)
+
+    with timed(metrics, 'clone'):
+        try:
+            log(f"\tCloning repository {repo}", log_file, repo=repo, stage="lint")
+            start = time.monotonic()
+            clone_repo(repo, repo_dir, clone_mode, mirrors_dir, CLONE_TIMEOUT)
+            elapsed = time.monotonic() - start
+            metrics['bytes_cloned'] = get_dir_size(repo_dir)
+            log(f"\t\tCloned repository {repo} ({clone_mode}) in {elapsed:.1f}s, {metrics['bytes_cloned']} bytes on disk", log_file, repo=repo, stage="lint")
+            # record what was linted, so links can point at this exact commit
+            entry['commit'], entry['branch'] = get_checkout_info(repo_dir)
+        except GitTimeout:
+            log(f"\t\tCloning repository {repo} timed out after {CLONE_TIMEOUT // 60} minutes.", log_file, level="ERROR", repo=repo, stage="lint")
+            return entry
+        except GitError as e:
+            log(f"\t\tError cloning repository {repo}: {e}", log_file, level="ERROR", repo=repo, stage="lint")
+            return entry
+
+    with timed(metrics, 'discover'):
+        if tool == 'baseline_tf' or tool == 'extended_tf':
+            files = find_terraform_files(repo_dir)
+            file_type = "Terraform"
+            runner_class, checks, checks_dir = TfRunner, CHECKS_TF, CHECKS_TF_DIR
+        else:
+            files = find_cf_files(repo_dir)
+            file_type = "CloudFormation"
+            runner_class, checks, checks_dir = CfRunner, CHECKS_CF, CHECKS_CF_DIR
+    metrics['files'] = len(files)
+
+    if not files:
+        log(f"\t\tNo {file_type} files found in repository {repo}.", log_file, repo=repo, stage="lint")
+        return entry
+
+    log(f"\t\tFound {len(files)} {file_type} files in repository {repo}.", log_file, repo=repo, stage="lint")
+    with timed(metrics, 'lint'):
+        passed_checks, failed_checks = run_checks(files, runner_class, checks, checks_dir, workspace, log_file, mode)
+    metrics['passed'] = len(passed_checks)
+    metrics['failed'] = len(failed_checks)
+
+    # Print the results
+    log("\t\t\tPassed checks:", log_file, repo=repo, stage="lint")
+    for check in passed_checks:
+        log(f"\t\t\t\t- {check.check_id}: {check.resource} - {check.file_path}:{check.file_line_range}", log_file, repo=repo, stage="lint")
+    log("\t\t\tFailed checks:", log_file, repo=repo, stage="lint")
+    for check in failed_checks:
+        log(f"\t\t\t\t- {check.check_id}: {check.resource} - {check.file_path}:{check.file_line_range}", log_file, repo=repo, stage="lint")
+
+    # Append to the entry
+    entry['checks'] = {
+        'passed_checks': serialize_check(passed_checks),
+        'failed_checks': serialize_check(failed_checks)
+    }
+    return entry
+
+def lint_repo_in_workspace(entry, tool, log_file, mode='file', cached=None, checks_hash=None, clone_mode='full', mirrors_dir=None):
+    # runs inside a pool worker: each repo gets a fresh directory that is removed afterwards
+    os.makedirs(WORKSPACES_DIR, exist_ok=True)
+    workspace = tempfile.mkdtemp(prefix="worker_", dir=WORKSPACES_DIR)
+    metrics = {}
+    try:
+        entry = lint_repo(entry, tool, log_file, workspace, mode, cached, checks_hash, clone_mode, metrics, mirrors_dir)
+    except Exception as e:
+        log(f"\t\tError processing repository {entry['repo']}: {e}", log_file, level="ERROR", repo=entry['repo'], stage="lint")
+    finally:
+        with timed(metrics, 'cleanup'):
+            delete_repo(log_file, workspace)
+    return entry, metrics
+
+def load_journal(journal_file):
+    # one JSON line per finished repo, a torn last line from a crash is ignored
+    done = {}
+    with open(journal_file, 'r') as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[entry['repo']] = entry
+    return done
+
+def append_to_journal(journal_file, entry):
+    with open(journal_file, 'a') as file:
+        file.write(json.dumps(entry, default=str) + '\n')
+        file.flush()
+        os.fsync(file.fileno())
+
+def run_linter(tool, workers=1, mode='file', incremental=False, clone_mode='full', resume=False, mirrors_dir=None):
     if not os.path.exists(CHECKS_CLONE_PATH):
         log("Cloning checks repository...")
         GitRepo.clone_from(REPO_CHECK_FILES, CHECKS_CLONE_PATH, depth=1)
     if (tool == 'baseline_tf'):
         file_path = FILE_BASELINE_TF
         log_file = LOGS_BASELINE_TF
+        cache_file = CACHE_BASELINE_TF
+        results_file = RESULTS_BASELINE_TF
     elif (tool == 'baseline_cf'):
         file_path = FILE_BASELINE_CF
         log_file = LOGS_BASELINE_CF
+        cache_file = CACHE_BASELINE_CF
+        results_file = RESULTS_BASELINE_CF
     elif (tool == 'extended_tf'):
         file_path = FILE_EXTENDED_TF
         log_file = LOGS_EXTENDED_TF
+        cache_file = CACHE_EXTENDED_TF
+        results_file = RESULTS_EXTENDED_TF
     elif (tool == 'extended_cf'):
         file_path = FILE_EXTENDED_CF
         log_file = LOGS_EXTENDED_CF
+        cache_file = CACHE_EXTENDED_CF
+        results_file = RESULTS_EXTENDED_CF
     else:
-        log(f"Unsupported tool: {tool}. Please use 'tf' for Terraform, 'cf' for CloudFormation, or 'unaware' for unaware repositories.", log_file)
+        log(f"Unsupported tool: {tool}. Please use 'baseline_tf', 'baseline_cf', 'extended_tf' or 'extended_cf'.")
         exit(1)
     data = load_yaml(file_path)
-    for entry in data:
-        repo = entry['repo']
-        log(f"Processing repository: {repo}", log_file)
-        cloningThread = Thread(target=cloneRepoThread, args=(repo, log_file))
-        cloningThread.start()
-        # timeout after 30 minutes if the cloning process is stuck
-        cloningThread.join(timeout=1800)
-        if cloningThread.is_alive():
-            cloningThread.terminate()
-            log(f"\t\tCloning repository {repo} timed out after 30 minutes.", log_file)
-            continue
-        log(f"\t\tSuccessfully cloned repository {repo}", log_file)
 
-        if tool == 'baseline_tf' or tool == 'extended_tf':
-            terraform_files = find_terraform_files()
-            if terraform_files:
-                log(f"\t\tFound {len(terraform_files)} Terraform files in repository {repo}.", log_file)
-                passed_checks = []
-                failed_checks = []
-                for file in terraform_files:
-                    try:
-                        runner_filter = RunnerFilter(checks=CHECKS_TF)
-                        runner = TfRunner()
-                        report = runner.run(root_folder=None, files=[file], runner_filter=runner_filter, external_checks_dir=[CHECKS_TF_DIR])
-                    
-                        passed = report.passed_checks
-                        failed = report.failed_checks
-
-                        for check in passed:
-                            check.file_path = file
-                        for check in failed:
-                            check.file_path = file
-
-                        passed_checks.extend(report.passed_checks)
-                        failed_checks.extend(report.failed_checks)
-
-                    except Exception as e:
-                        log(f"\t\tError running checks on: {e}")
-                        continue
-                
-                # Print the results
-                log("\t\t\tPassed checks:")
-                for check in passed_checks:
-                    log(f"\t\t\t\t- {check.check_id}: {check.resource} - {check.file_path}:{check.file_line_range}")
-
-                log("\t\t\tFailed checks:")
-                for check in failed_checks:
-                    log(f"\t\t\t\t- {check.check_id}: {check.resource} - {check.file_path}:{check.file_line_range}")
-
-                # Append to the entry
-                entry['checks'] = {
-                    'passed_checks': serialize_check(passed_checks),
-                    'failed_checks': serialize_check(failed_checks)
-                }
-
-            else:
-                log(f"\t\tNo Terraform files found in repository {repo}.")
-        elif tool == 'baseline_cf' or tool == 'extended_cf':
-            cf_files = find_cf_files()
-            if cf_files:
-                log(f"\t\tFound {len(cf_files)} CloudFormation files in repository {repo}.")
-                passed_checks = []
-                failed_checks = []
-                for file in cf_files:
-                    try:
-                        runner_filter = RunnerFilter(checks=CHECKS_CF)
-                        runner = CfRunner()
-                        report = runner.run(root_folder=None, files=[file], runner_filter=runner_filter, external_checks_dir=[CHECKS_CF_DIR])
-
-                        passed = report.passed_checks
-                        failed = report.failed_checks
-
-                        for check in passed:
-                            check.file_path = file
-
-                        for check in failed:
-                            check.file_path = file
-                            
-                        passed_checks.extend(report.passed_checks)
-                        failed_checks.extend(report.failed_checks)
-
-                    except Exception as e:
-                        log(f"\t\tError running checks on: {e}")
-                        continue
-
-                # Print the results
-                log("\t\t\tPassed checks:", log_file)
-                for check in passed_checks:
-                    log(f"\t\t\t\t- {check.check_id}: {check.resource} - {check.file_path}:{check.file_line_range}", log_file)
-                log("\t\t\tFailed checks:", log_file)
-                for check in failed_checks:
-                    log(f"\t\t\t\t- {check.check_id}: {check.resource} - {check.file_path}:{check.file_line_range}", log_file)
-
-                # Append to the entry
-                entry['checks'] = {
-                    'passed_checks': serialize_check(passed_checks),
-                    'failed_checks': serialize_check(failed_checks)
+    # the cache maps each repo URL to the HEAD commit and check set it was last linted with
+    cache = {}
+    checks_hash = None
+    if incremental:
+        if os.path.exists(cache_file):
+            cache = load_yaml(cache_file) or {}
+        if tool.endswith('_tf'):
+            checks_hash = get_checks_hash(CHECKS_TF, CHECKS_TF_DIR, mode)
+        else:
+            checks_hash = get_checks_hash(CHECKS_CF, CHECKS_CF_DIR, mode)
+    cached = [cache.get(entry['repo']) for entry in data]
+
+    # every finished repo is appended to the journal right away, so a crash only loses the repos in flight
+    journal_file = os.path.splitext(results_file)[0] + '.journal.jsonl'
+    done = {}
+    if resume and os.path.exists(journal_file):
+        done = load_journal(journal_file)
+        log(f"Resuming: {len(done)} repositories already linted in {journal_file}", log_file)
+    elif os.path.exists(journal_file):
+        os.remove(journal_file)
+    pending = [i for i, entry in enumerate(data) if entry['repo'] not in done]
+
+    # one JSON line of phase timings and counts per repo
+    metrics_file = os.path.join(os.path.dirname(results_file), 'metrics.jsonl')
+    if not resume and os.path.exists(metrics_file):
+        os.remove(metrics_file)
+
+    if workers > 1:
+        log(f"Linting {len(pending)} repositories with {workers} workers", log_file)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(lint_repo_in_workspace, data[i], tool, log_file, mode, cached[i], checks_hash, clone_mode, mirrors_dir) for i in pending]
+            for future in as_completed(futures):
+                entry, metrics = future.result()
+                append_to_journal(journal_file, entry)
+                append_metrics(metrics, metrics_file)
+                done[entry['repo']] = entry
+    else:
+        for i in pending:
+            metrics = {}
+            entry = data[i]
+            try:
+                entry = lint_repo(entry, tool, log_file, mode=mode, cached=cached[i], checks_hash=checks_hash, clone_mode=clone_mode, metrics=metrics, mirrors_dir=mirrors_dir)
+            except Exception as e:
+                log(f"\t\tError processing repository {entry['repo']}: {e}", log_file, level="ERROR", repo=entry['repo'], stage="lint")
+            append_to_journal(journal_file, entry)
+            append_metrics(metrics, metrics_file)
+            done[entry['repo']] = entry
+
+    # compact the journal back into the input order
+    data = [done.get(entry['repo'], entry) for entry in data]
+
+    if incremental:
+        for entry in data:
+            if entry.get('commit'):
+                cache[entry['repo']] = {
+                    'commit': entry['commit'],
+                    'branch': entry.get('branch'),
+                    'checks_hash': checks_hash,
+                    'checks': entry.get('checks')
                 }
-
-            else:
-                log(f"\t\tNo CloudFormation files found in repository {repo}.", log_file)
-
-    # Save the results to the respective files
-    if tool == 'tf':
-        save_to_file(data, RESULTS_BASELINE_TF)
-        log(f"Results saved to {RESULTS_BASELINE_TF}", log_file)
-    elif tool == 'cf':
-        save_to_file(data, RESULTS_BASELINE_CF)
-        log(f"Results saved to {RESULTS_BASELINE_CF}", log_file)
-    elif tool == 'unaware':
-        save_to_file(data, RESULTS_EXTENDED_TF)
-        log(f"Results saved to {RESULTS_EXTENDED_TF}", log_file)
-    elif tool == 'extended_tf':
-        save_to_file(data, RESULTS_EXTENDED_TF)
-        log(f"Results saved to {RESULTS_EXTENDED_TF}", log_file)
-    elif tool == 'extended_cf':
-        save_to_file(data, RESULTS_EXTENDED_CF)
-        log(f"Results saved to {RESULTS_EXTENDED_CF}", log_file)
-
-    log("Finished processing repositories.", log_file)
\ No newline at end of file
+        save_to_file(cache, cache_file)
+        log(f"Lint cache saved to {cache_file}", log_file)
+
+    save_to_file(data, results_file)
+    log(f"Results saved to {results_file}", log_file)
+    if os.path.exists(journal_file):
+        os.remove(journal_file)
+
+    if os.path.exists(metrics_file):
+        summary = summarize_metrics(load_metrics(metrics_file))
+        save_to_file(summary, os.path.join(os.path.dirname(results_file), 'metrics_summary.yml'))
+        log(f"Timings over {summary['repos']} repositories (seconds):", log_file)
+        for phase, stats in summary['phases'].items():
+            log(f"\t{phase}: p50 {stats['p50']}, p95 {stats['p95']}, max {stats['max']}", log_file)
+        log("Slowest repositories:", log_file)
+        for slow in summary['slowest_repos']:
+            log(f"\t{slow['repo']}: {slow['seconds']}s", log_file)
+
+    log("Finished processing repositories.", log_file)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the cost checks on the active repositories of a dataset.")
+    parser.add_argument("tool", choices=["baseline_tf", "baseline_cf", "extended_tf", "extended_cf"])
+    parser.add_argument("--workers", type=int, default=1, help="number of repositories cloned and linted in parallel")
+    parser.add_argument("--mode", choices=LINT_MODES, default="file", help="how many files are linted in one Checkov run")
+    parser.add_argument("--incremental", action="store_true", help="reuse the checks of repositories whose HEAD commit has not changed")
+    parser.add_argument("--clone", choices=CLONE_MODES, default="full", help="'sparse' only downloads the .tf/.yaml/.yml files")
+    parser.add_argument("--resume", action="store_true", help="skip the repositories already in the journal of an interrupted run")
+    parser.add_argument("--mirrors", metavar="DIR", help="keep a bare mirror of every repository in DIR and clone from it")
+    args = parser.parse_args()
+
+    run_linter(args.tool, workers=args.workers, mode=args.mode, incremental=args.incremental, clone_mode=args.clone, resume=args.resume, mirrors_dir=args.mirrors)
@@ -0,0 +1,327 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import datetime
+import threading
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+
+from utils.logger import log
+from utils.yaml_utils import save_to_file
+from utils.metrics import timed
+
+load_dotenv()
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATASETS = ['baseline_tf', 'baseline_cf', 'extended_tf', 'extended_cf']
+DATASET_STAGES = ['active_repo', 'active_file', 'keywords', 'activity', 'lint', 'links']
+GLOBAL_STAGES = ['clean', 'publish', 'findings', 'awareness', 'totals', 'combinations']
+
+# input and output hashes of every stage that finished, a stage is skipped while both still match
+STATE_FILE = 'results/pipeline_state.json'
+TIMINGS_FILE = 'results/pipeline_timings.yml'
+# where run_linter clones the custom checks
+CHECKS_DIR = 'checkov_check/checkov_check/checks'
+
+REPO_MONTHS = 6
+FILE_MONTHS = 12
+KEYWORD_MONTHS = 12
+
+# "dataset:stage" for the stages of one dataset, the stage name alone for the ones over all datasets;
+# a stage with a cwd runs alone, the reports scripts resolve their paths against the working directory
+Stage = namedtuple('Stage', ['key', 'deps', 'inputs', 'outputs', 'params', 'run', 'cwd'])
+
+GITHUB_CLIENT = None
+GITHUB_LOCK = threading.Lock()
+
+def get_github_client():
+    # connected on first use, skipped stages need no token
+    global GITHUB_CLIENT
+    from utils.github_utils import github_connect
+    with GITHUB_LOCK:
+        if GITHUB_CLIENT is None:
+            GITHUB_CLIENT = github_connect(os.getenv("GITHUB_TOKENS") or os.getenv("GITHUB_TOKEN"))
+    return GITHUB_CLIENT
+
+def cutoff_day(months):
+    # the activity stages look back from today, their results change with the day even on unchanged inputs
+    return (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=30 * months)).strftime("%Y-%m-%d")
+
+def dataset_paths(tool):
+    activity = f'results/{tool}/activity'
+    return {
+        'original': f'results/original/{tool}.yml',
+        'active_repos': f'{activity}/repo/active_repos.yml',
+        'inactive_repos': f'{activity}/repo/inactive_repos.yml',
+        'error_repos': f'{activity}/repo/error_repos.yml',
+        'active_files': f'{activity}/file/active_files.yml',
+        'keywords': f'{activity}/keywords_{KEYWORD_MONTHS}m/keywords_repos.yml',
+        'no_keywords': f'{activity}/keywords_{KEYWORD_MONTHS}m/no_keywords_repos.yml',
+        'results': f'results/{tool}/checkov/results.yml',
+        'results_full_link': f'results/{tool}/checkov/results_full_link.yml',
+    }
+
+def hash_paths(paths, params):
+    # contents of every input file (all files of a directory), plus the options the stage runs with
+    digest = hashlib.blake2b(json.dumps(params, sort_keys=True).encode(), digest_size=16)
+    for path in paths:
+        path = os.path.join(ROOT, path)
+        if os.path.isdir(path):
+            files = sorted(os.path.join(folder, name) for folder, _, names in os.walk(path) for name in names
+                           if '__pycache__' not in folder and not os.path.join(folder, name).endswith('.pyc'))
+        else:
+            files = [path]
+        for file_path in files:
+            digest.update(os.path.relpath(file_path, ROOT).encode() + b'\0')
+            if not os.path.exists(file_path):
+                digest.update(b'missing')
+                continue
+            with open(file_path, 'rb') as file:
+                for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return {}
+    with open(STATE_FILE) as file:
+        return json.load(file)
+
+def save_state(state):
+    temp_path = STATE_FILE + '.tmp'
+    with open(temp_path, 'w') as file:
+        json.dump(state, file, indent=1, sort_keys=True)
+    os.replace(temp_path, STATE_FILE)
+
+def dataset_stages(tool, options):
+    paths = dataset_paths(tool)
+    file_type = 'tf' if tool.endswith('_tf') else 'cf'
+    log_files = {name: os.path.join(os.path.dirname(paths[output]), 'logs.txt')
+                 for name, output in [('repo', 'active_repos'), ('file', 'active_files'), ('keywords', 'keywords')]}
+
+    def active_repo():
+        from activity.active_repo import find_active
+        backend = 'graphql' if options['activity_backend'] == 'local' else 'rest'
+        find_active(get_github_client(), paths['original'], log_files['repo'], paths['active_repos'],
+                    paths['inactive_repos'], paths['error_repos'], months=REPO_MONTHS, backend=backend)
+
+    def active_file():
+        from activity.active_file import check_tf_file, check_cf_file, join_activity
+        check_file = check_tf_file if file_type == 'tf' else check_cf_file
+        check_file(get_github_client(), paths['active_repos'], log_files['file'], paths['active_files'],
+                   months=FILE_MONTHS, backend=options['activity_backend'])
+        # keywords and lint take entries with a "repo" field, not the URL list check_file writes
+        join_activity(paths['active_files'], paths['active_repos'])
+
+    def keywords():
+        from activity.keywords import search_keywords
+        search_keywords(get_github_client(), paths['active_files'], log_files['keywords'], paths['keywords'],
+                        paths['no_keywords'], search="months", months=KEYWORD_MONTHS, backend=options['activity_backend'])
+
+    def activity():
+        from activity.history_scan import scan_activity
+        scan_activity(get_github_client(), paths['original'], file_type, log_files['repo'], paths,
+                      repo_months=REPO_MONTHS, file_months=FILE_MONTHS, keyword_months=KEYWORD_MONTHS)
+
+    def lint():
+        # own process: Checkov keeps global registries, two datasets must not share them
+        command = [sys.executable, '-m', 'checkov_check.run_linter', tool, '--workers', str(options['workers']),
+                   '--mode', options['mode'], '--clone', options['clone'], '--incremental']
+        subprocess.run(command, cwd=ROOT, check=True)
+
+    def links():
+        from checkov_check.complete_path import replace_file_paths_with_links
+        replace_file_paths_with_links(tool)
+
+    activity_params = {'backend': options['activity_backend']}
+    activity_outputs = [paths['active_repos'], paths['inactive_repos'], paths['error_repos']]
+    lint_params = {'mode': options['mode'], 'clone': options['clone']}
+    if options['activity_backend'] == 'fused':
+        # one stage walks each history once and writes all activity outputs
+        activity_stages = [
+            Stage(f'{tool}:activity', [], [paths['original']], activity_outputs + [paths['active_files'], paths['keywords'], paths['no_keywords']],
+                  dict(activity_params, months=[REPO_MONTHS, FILE_MONTHS, KEYWORD_MONTHS],
+                       since=[cutoff_day(REPO_MONTHS), cutoff_day(FILE_MONTHS), cutoff_day(KEYWORD_MONTHS)]), activity, None),
+        ]
+    else:
+        activity_stages = [
+            Stage(f'{tool}:active_repo', [], [paths['original']], activity_outputs,
+                  dict(activity_params, months=REPO_MONTHS, since=cutoff_day(REPO_MONTHS)), active_repo, None),
+            Stage(f'{tool}:active_file', [f'{tool}:active_repo'], [paths['active_repos']], [paths['active_files']],
+                  dict(activity_params, months=FILE_MONTHS, since=cutoff_day(FILE_MONTHS)), active_file, None),
+            Stage(f'{tool}:keywords', [f'{tool}:active_file'], [paths['active_files']], [paths['keywords'], paths['no_keywords']],
+                  dict(activity_params, months=KEYWORD_MONTHS, since=cutoff_day(KEYWORD_MONTHS)), keywords, None),
+        ]
+    files_stage = f'{tool}:activity' if options['activity_backend'] == 'fused' else f'{tool}:active_file'
+    return activity_stages + [
+        Stage(f'{tool}:lint', [files_stage], [paths['active_files'], CHECKS_DIR], [paths['results']],
+              lint_params, lint, None),
+        Stage(f'{tool}:links', [f'{tool}:lint'], [paths['results']], [paths['results_full_link']],
+              {}, links, None),
+    ]
+
+def global_stages():
+    inputs = [path for tool in DATASETS for path in (dataset_paths(tool)['results'], dataset_paths(tool)['keywords'])]
+
+    def clean():
+        from reports.modules.clean_datasets import check_duplicates, clean_datasets
+        os.makedirs('raw_data', exist_ok=True)
+        check_duplicates()
+        clean_datasets()
+
+    def publish():
+        shutil.copyfile('reports/data/combined_data.yml', 'results/combined_data.yml')
+
+    def findings():
+        from reports.modules.findings import export_findings
+        export_findings('results/combined_data.yml')
+
+    def awareness():
+        from reports.modules.stats import get_awareness_stats
+        get_awareness_stats('../../results/combined_data.yml')
+
+    def totals():
+        from reports.modules.stats import aggregate_totals
+        aggregate_totals('../results/combined_data.yml')
+
+    def combinations():
+        from reports.modules.check_combinations import get_check_combinations
+        get_check_combinations()
+
+    dataset_keys = [f'{tool}:{name}' for tool in DATASETS for name in ('keywords', 'activity', 'lint')]
+    combined = ['results/combined_data.yml']
+    # the report stages query the findings store, which reads as current as long as combined_data.yml is unchanged
+    store = ['results/findings.sqlite']
+    return [
+        Stage('clean', dataset_keys, inputs, ['reports/data/combined_data.yml'], {}, clean, 'reports'),
+        Stage('publish', ['clean'], ['reports/data/combined_data.yml'], combined, {}, publish, None),
+        Stage('findings', ['publish'], combined, store, {}, findings, None),
+        Stage('awareness', ['findings'], combined + store, ['reports/awareness_stats_tool.yml', 'reports/awareness_stats_dataset.yml'],
+              {}, awareness, 'reports/modules'),
+        Stage('totals', ['findings'], combined + store, ['reports/aggregated_totals.yml'], {}, totals, 'reports'),
+        Stage('combinations', ['findings'], combined + store, ['reports/check_combinations.yml'], {}, combinations, 'reports/modules'),
+    ]
+
+def report(message):
+    # the plan and the progress go to the terminal as well as to the log
+    print(message)
+    log(message)
+
+def run_stage(stage):
+    for output in stage.outputs:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    if stage.cwd:
+        os.chdir(stage.cwd)
+    try:
+        stage.run()
+    finally:
+        os.chdir(ROOT)
+
+def run_pipeline(stages, force=False, dry_run=False, parallel=len(DATASETS)):
+    keys = {stage.key for stage in stages}
+    # dependencies outside the selection count as done
+    pending = {stage.key: stage._replace(deps=[dep for dep in stage.deps if dep in keys]) for stage in stages}
+    state = load_state()
+    status = {}
+    metrics = {'phases': {}}
+    running = {}
+
+    def start(executor, stage, inputs_hash):
+        def task():
+            with timed(metrics, stage.key):
+                run_stage(stage)
+        running[executor.submit(task)] = (stage, inputs_hash)
+
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        while pending or running:
+            for key, stage in list(pending.items()):
+                if any(running_stage.cwd for running_stage, _ in running.values()):
+                    break
+                if any(status.get(dep) in ('failed', 'blocked') for dep in stage.deps):
+                    report(f"Blocked: {key}")
+                    status[key] = 'blocked'
+                    del pending[key]
+                    continue
+                if not all(status.get(dep) in ('done', 'skipped') for dep in stage.deps):
+                    continue
+                if stage.cwd and running:
+                    continue
+
+                inputs_hash = hash_paths(stage.inputs, stage.params)
+                previous = state.get(key)
+                if not force and previous and previous['inputs'] == inputs_hash and previous['outputs'] == hash_paths(stage.outputs, {}):
+                    report(f"Up to date: {key}")
+                    status[key] = 'skipped'
+                    del pending[key]
+                    continue
+
+                del pending[key]
+                if dry_run:
+                    report(f"Would run: {key}")
+                    status[key] = 'done'
+                    continue
+                report(f"Running: {key}")
+                start(executor, stage, inputs_hash)
+                if stage.cwd:
+                    break
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, inputs_hash = running.pop(future)
+                try:
+                    future.result()
+                except (Exception, SystemExit) as e:
+                    report(f"Failed: {stage.key} after {metrics['phases'][stage.key]:.1f}s: {e}")
+                    status[stage.key] = 'failed'
+                    continue
+                report(f"Done: {stage.key} in {metrics['phases'][stage.key]:.1f}s")
+                status[stage.key] = 'done'
+                state[stage.key] = {'inputs': inputs_hash, 'outputs': hash_paths(stage.outputs, {})}
+                save_state(state)
+
+    timings = [{'stage': stage.key, 'status': status.get(stage.key), 'seconds': round(metrics['phases'].get(stage.key, 0), 3)}
+               for stage in stages]
+    for timing in timings:
+        report(f"\t{timing['stage']}: {timing['status']} ({timing['seconds']}s)")
+    if not dry_run:
+        save_to_file(timings, TIMINGS_FILE)
+    return status
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the activity, linting and report stages over the datasets, skipping stages whose inputs did not change.")
+    parser.add_argument("--datasets", nargs="+", choices=DATASETS, default=DATASETS)
+    parser.add_argument("--stages", nargs="+", choices=DATASET_STAGES + GLOBAL_STAGES, help="only run these stages (default: all)")
+    parser.add_argument("--force", action="store_true", help="run the selected stages even if their inputs did not change")
+    parser.add_argument("--dry-run", action="store_true", help="only list the stages that would run")
+    parser.add_argument("--parallel", type=int, default=len(DATASETS), help="stages run at the same time, across datasets")
+    parser.add_argument("--activity-backend", choices=["api", "local", "fused"], default="api",
+                        help="'local' answers the activity questions from git history, 'fused' does it in one pass per repository")
+    parser.add_argument("--workers", type=int, default=1, help="run_linter workers per dataset")
+    parser.add_argument("--mode", choices=["file", "module", "repo"], default="file")
+    parser.add_argument("--clone", choices=["full", "sparse"], default="full")
+    parser.add_argument("--http-cache", action="store_true",
+                        help="answer repeated GitHub GET requests of the activity stages from a local SQLite cache")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    if args.http_cache:
+        from utils.http_cache import enable_http_cache
+        enable_http_cache()
+    options = {'activity_backend': args.activity_backend, 'workers': args.workers, 'mode': args.mode, 'clone': args.clone}
+    stages = [stage for tool in args.datasets for stage in dataset_stages(tool, options)]
+    if set(args.datasets) == set(DATASETS):
+        # the report stages combine all four datasets
+        stages += global_stages()
+    if args.stages:
+        stages = [stage for stage in stages if stage.key.split(':')[-1] in args.stages]
+
+    status = run_pipeline(stages, force=args.force, dry_run=args.dry_run, parallel=args.parallel)
+    if 'failed' in status.values():
+        sys.exit(1)
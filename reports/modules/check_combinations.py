@@ -1,31 +1,27 @@
 import sys
 import os
-from collections import defaultdict
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from utils.yaml_utils import load_yaml, save_to_file
+from utils.yaml_utils import save_to_file
+from reports.modules.findings import COMBINED_DATA, open_findings
 
-def get_check_combinations():
-    data = load_yaml("../../results/combined_data.yml")
-    unique_combos = defaultdict(lambda: {"count": 0, "repos": set()})
-
-    for entry in data:
-        repo = entry["repo"]
-        checks = {check["check_id"] for check in entry.get("failed_checks", [])}
-
-        key = tuple(sorted(checks))
-        unique_combos[key]["count"] += 1
-        unique_combos[key]["repos"].add(repo)
+def get_check_combinations(data_file=COMBINED_DATA):
+    # check_set is the sorted list of distinct failed check ids of an entry
+    db = open_findings(data_file)
+    rows = db.execute("""SELECT check_set, COUNT(*), json_group_array(DISTINCT repo)
+                         FROM repos GROUP BY check_set ORDER BY MIN(position)""")
 
     result = []
-    for checks, info in unique_combos.items():
+    for checks, count, repos in rows:
         result.append({
-            "checks": list(checks),
-            "count": info["count"],
-            "repos": sorted(info["repos"]),
+            "checks": json.loads(checks),
+            "count": count,
+            "repos": sorted(json.loads(repos)),
         })
+    db.close()
 
-    save_to_file(result, "../check_combinations.yml")
\ No newline at end of file
+    save_to_file(result, "../check_combinations.yml")
@@ -11,7 +11,7 @@ load_dotenv()
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.logger import log
 from utils.yaml_utils import load_yaml, save_to_file, add_to_file
-from utils.usage import extract_repo
+from utils.usage import RepoRegistry
 from modules.associate_forms import associate_forms
 
 CHECK_ID_TO_NAME = {
@@ -38,71 +38,37 @@ CHECK_ID_TO_DESCRIPTION = {
 
 LOGS_FILE = "logs.txt"
 
-def check_duplicates():
-    baseline_tf = load_yaml("../results/baseline_tf/checkov/results.yml")
-    baseline_tf_repos = extract_repo(baseline_tf)
-
-    baseline_cf = load_yaml("../results/baseline_cf/checkov/results.yml")
-    baseline_cf_repos = extract_repo(baseline_cf)
-
-    extended_tf = load_yaml("../results/extended_tf/checkov/results.yml")
-    extended_tf_repos = extract_repo(extended_tf)
-
-    extended_cf = load_yaml("../results/extended_cf/checkov/results.yml")
-    extended_cf_repos = extract_repo(extended_cf)
-
-    all_datasets = baseline_tf_repos + baseline_cf_repos + extended_tf_repos + extended_cf_repos
-    unique_datasets = set()
+DATASETS = ["baseline_tf", "baseline_cf", "extended_tf", "extended_cf"]
+# a repo already in an earlier dataset is dropped from these
+EXTENDED_DATASETS = {"extended_tf", "extended_cf"}
 
-    duplicates = set()
-    for dataset in all_datasets:
-        if dataset in unique_datasets:
-            duplicates.add(dataset)
-        else:
-            unique_datasets.add(dataset)
+def check_duplicates():
+    registry = RepoRegistry()
+    datasets = {}
+    for name in DATASETS:
+        # the first occurrence of a repo is kept, later ones only leave the extended datasets
+        datasets[name] = [
+            entry for entry in load_yaml(f"../results/{name}/checkov/results.yml") or []
+            if registry.add(entry['repo'], name) or name not in EXTENDED_DATASETS
+        ]
+
+    duplicates = registry.duplicates()
     if duplicates:
         log("Duplicates found:", LOGS_FILE)
-        for dup in duplicates:
+        for dup, sources in duplicates.items():
             log(f"\t{dup}", LOGS_FILE)
-            # Find out which datasets the duplicate appears in
-            sources = []
-            if dup in baseline_tf_repos:
-                sources.append("baseline_tf")
-            if dup in baseline_cf_repos:    
-                sources.append("baseline_cf")
-            if dup in extended_tf_repos:
-                sources.append("extended_tf")
-            if dup in extended_cf_repos:
-                sources.append("extended_cf")
             log(f"\t\tAppears in: {', '.join(sources)}", LOGS_FILE)
-
-            # remove the duplicate from the extended datasets
-            if dup in extended_tf_repos:
-                # remove the first entry with that ['repo'] from the extended_tf dataset
-                for i, entry in enumerate(extended_tf):
-                    if entry['repo'] == dup:
-                        extended_tf.pop(i)
-                        break
-
-            if dup in extended_cf_repos:
-                # remove the first entry with that ['repo'] from the extended_cf dataset
-                for i, entry in enumerate(extended_cf):
-                    if entry['repo'] == dup:
-                        extended_cf.pop(i)
-                        break            
-
         log("Duplicates removed from extended datasets.", LOGS_FILE)
-        save_to_file(baseline_tf, "raw_data/baseline_tf.yml")
-        save_to_file(baseline_cf, "raw_data/baseline_cf.yml")
-        save_to_file(extended_tf, "raw_data/extended_tf.yml")
-        save_to_file(extended_cf, "raw_data/extended_cf.yml")
-
     else:
         log("No duplicates found across datasets.", LOGS_FILE)
 
+    # written either way, clean_datasets reads these and must not pick up an older run
+    for name, data in datasets.items():
+        save_to_file(data, f"raw_data/{name}.yml")
+
 def clean_data(data, tool, dataset, keywords_dataset):
     cleaned_data = []
-    aware_repos = {entry["repo"] for entry in keywords_dataset}
+    aware_repos = RepoRegistry().add_all(keywords_dataset, "keywords")
 
     for entry in data:
         failed_checks = entry.get("checks", {}).get("failed_checks", [])
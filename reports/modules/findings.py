@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+import argparse
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(root_dir)
+from utils.logger import log
+from utils.yaml_utils import load_yaml
+
+COMBINED_DATA = os.path.join(root_dir, 'results', 'combined_data.yml')
+# the store of a data file sits next to it, "findings.sqlite" and, with pyarrow installed, "findings.parquet"
+FINDINGS_NAME = 'findings'
+
+REPO_COLUMNS = ['repo', 'tool', 'dataset', 'cost_awareness', 'failed_checks_count', 'files_count', 'form_link']
+CHECK_COLUMNS = ['check_id', 'check_name', 'file_path', 'file_line_range', 'resource']
+LOAD_CHUNK = 500
+
+# one row per entry of the data file (position is its index) and one per failed check of an entry;
+# check_set is the sorted list of distinct failed check ids, entry the rest of the entry as JSON
+SCHEMA = [
+    """CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)""",
+    """CREATE TABLE repos (
+        position INTEGER PRIMARY KEY, repo TEXT, tool TEXT, dataset TEXT, cost_awareness TEXT,
+        failed_checks_count INTEGER, files_count INTEGER, form_link TEXT,
+        findings_count INTEGER, check_set TEXT, entry TEXT)""",
+    """CREATE TABLE findings (
+        position INTEGER, check_index INTEGER, repo TEXT, tool TEXT, dataset TEXT, cost_awareness TEXT,
+        check_id TEXT, check_name TEXT, file_path TEXT, file_line_range TEXT, resource TEXT,
+        PRIMARY KEY (position, check_index)) WITHOUT ROWID""",
+    "CREATE INDEX repos_repo ON repos (repo)",
+    "CREATE INDEX repos_group ON repos (tool, dataset, cost_awareness)",
+    "CREATE INDEX findings_repo ON findings (repo)",
+    "CREATE INDEX findings_check ON findings (check_id)",
+    "CREATE INDEX findings_group ON findings (tool, dataset, cost_awareness, check_id)",
+]
+
+def findings_paths(data_file):
+    directory = os.path.dirname(os.path.abspath(data_file))
+    return os.path.join(directory, FINDINGS_NAME + '.sqlite'), os.path.join(directory, FINDINGS_NAME + '.parquet')
+
+def file_digest(path):
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def flatten(data):
+    # (repo rows, finding rows) in the column order of the tables
+    repo_rows = []
+    finding_rows = []
+    for position, entry in enumerate(data or []):
+        failed_checks = entry.get('failed_checks') or []
+        rest = {key: value for key, value in entry.items() if key != 'failed_checks'}
+        check_set = sorted({check['check_id'] for check in failed_checks})
+        repo_rows.append([position] + [entry.get(column) for column in REPO_COLUMNS] +
+                         [len(failed_checks), json.dumps(check_set), json.dumps({'entry': rest, 'has_checks': 'failed_checks' in entry})])
+        for check_index, check in enumerate(failed_checks):
+            finding_rows.append([position, check_index] + [entry.get(column) for column in REPO_COLUMNS[:4]] +
+                                [check.get(column) for column in CHECK_COLUMNS])
+    return repo_rows, finding_rows
+
+def write_parquet(finding_rows, parquet_path):
+    columns = ['position', 'check_index'] + REPO_COLUMNS[:4] + CHECK_COLUMNS
+    table = pyarrow.Table.from_pydict({column: [row[i] for row in finding_rows] for i, column in enumerate(columns)})
+    temp_path = f"{parquet_path}.{os.getpid()}.tmp"
+    pyarrow.parquet.write_table(table, temp_path, compression='zstd')
+    os.replace(temp_path, parquet_path)
+
+def export_findings(data_file=COMBINED_DATA, log_file=None):
+    db_path, parquet_path = findings_paths(data_file)
+    file_stat = os.stat(data_file)
+    digest = file_digest(data_file)
+    repo_rows, finding_rows = flatten(load_yaml(data_file))
+
+    # built aside and swapped in, readers never see a half-written store
+    temp_path = f"{db_path}.{os.getpid()}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    db = sqlite3.connect(temp_path)
+    try:
+        for statement in SCHEMA:
+            db.execute(statement)
+        db.executemany(f"INSERT INTO repos VALUES ({', '.join('?' * 11)})", repo_rows)
+        db.executemany(f"INSERT INTO findings VALUES ({', '.join('?' * 11)})", finding_rows)
+        db.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ('source', os.path.abspath(data_file)), ('mtime_ns', str(file_stat.st_mtime_ns)),
+            ('size', str(file_stat.st_size)), ('digest', digest)])
+        db.commit()
+    finally:
+        db.close()
+    os.replace(temp_path, db_path)
+
+    if pyarrow is not None:
+        write_parquet(finding_rows, parquet_path)
+    log(f"Exported {len(repo_rows)} repositories and {len(finding_rows)} failed checks from {data_file} to {db_path}"
+        + (f" and {parquet_path}" if pyarrow is not None else " (pyarrow not installed, no Parquet file)"), log_file)
+    return db_path
+
+def is_current(db, data_file):
+    # the data file's mtime and size, or else its content hash, still match the export
+    meta = dict(db.execute("SELECT key, value FROM meta"))
+    file_stat = os.stat(data_file)
+    if meta.get('mtime_ns') == str(file_stat.st_mtime_ns) and meta.get('size') == str(file_stat.st_size):
+        return True
+    return meta.get('digest') == file_digest(data_file)
+
+def open_findings(data_file=COMBINED_DATA):
+    # a read-only connection to the store of data_file, exported again first if the data file changed
+    db_path, _ = findings_paths(data_file)
+    if os.path.exists(db_path):
+        db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            if is_current(db, data_file):
+                return db
+        except sqlite3.DatabaseError:
+            pass
+        db.close()
+    export_findings(data_file)
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+def load_entries(db, positions):
+    # the entries at these positions as in the data file, failed checks in their original order;
+    # queried in chunks, SQLite limits the number of parameters of a statement
+    entries = {}
+    for start in range(0, len(positions), LOAD_CHUNK):
+        chunk = positions[start:start + LOAD_CHUNK]
+        placeholders = ', '.join('?' * len(chunk))
+        for position, entry in db.execute(f"SELECT position, entry FROM repos WHERE position IN ({placeholders})", chunk):
+            stored = json.loads(entry)
+            entries[position] = stored['entry']
+            if stored['has_checks']:
+                entries[position]['failed_checks'] = []
+        rows = db.execute(f"SELECT position, {', '.join(CHECK_COLUMNS)} FROM findings WHERE position IN ({placeholders}) "
+                          "ORDER BY position, check_index", chunk)
+        for position, *values in rows:
+            entries[position].setdefault('failed_checks', []).append(
+                {column: value for column, value in zip(CHECK_COLUMNS, values) if value is not None})
+    return [entries[position] for position in positions]
+
+def find_entry(db, repo):
+    # the first entry of a repo, as a scan of the data file would find it
+    row = db.execute("SELECT position FROM repos WHERE repo = ? ORDER BY position LIMIT 1", (repo,)).fetchone()
+    return load_entries(db, [row[0]])[0] if row else None
+
+def find_entries(db, repos=None, tool=None, dataset=None, cost_awareness=None):
+    # repo -> its first entry, for the given repos or all of them, narrowed down by tool, dataset and awareness
+    conditions = [(column, value) for column, value in (('tool', tool), ('dataset', dataset), ('cost_awareness', cost_awareness))
+                  if value is not None]
+    where = " WHERE " + " AND ".join(f"{column} = ?" for column, _ in conditions) if conditions else ""
+    first = dict(db.execute(f"SELECT repo, MIN(position) FROM repos{where} GROUP BY repo ORDER BY MIN(position)",
+                            [value for _, value in conditions]))
+    if repos is not None:
+        first = {repo: first[repo] for repo in repos if repo in first}
+    return dict(zip(first, load_entries(db, list(first.values()))))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the failed checks of a combined data file to an indexed SQLite store (and Parquet, with pyarrow).")
+    parser.add_argument("data_file", nargs="?", default=COMBINED_DATA)
+    args = parser.parse_args()
+    export_findings(args.data_file)
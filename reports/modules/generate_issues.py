@@ -1,13 +1,20 @@
 import sys
 import os
-import requests
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.logger import log
-from utils.yaml_utils import load_yaml, add_to_file
+from utils.yaml_utils import load_yaml
+from utils.github_async import request_all
+from utils.record_store import append_records, import_yaml, export_yaml, load_index
+
+ISSUE_CONCURRENCY = 1
+# the outcomes are appended to record files, the YAML files next to them are exports of those
+ISSUES_OPENED = "../gh_issues/issues_opened.yml"
+ISSUES_NOT_OPENED = "../gh_issues/issues_not_opened.yml"
 
 def generate_issue_message_survey(entry):
     check = entry["example_check"]
@@ -104,12 +111,33 @@ def repo_url_to_owner_repo(repo_url):
     repo = parts[-1]
     return owner, repo
 
+def issue_records(yaml_path):
+    # the record file of an outcome, started from the YAML file written before there was one
+    path = os.path.splitext(yaml_path)[0] + ".records"
+    if not os.path.exists(path) and os.path.exists(yaml_path):
+        import_yaml(yaml_path, path)
+    return path
+
+def record_issues(records, yaml_path):
+    path = issue_records(yaml_path)
+    append_records(path, records)
+    export_yaml(path, yaml_path)
+
 def open_issues(filename, message_type="survey"):
     log(f"Opening issues from {filename} with message type '{message_type}'", "../logs.txt")
     data = load_yaml(filename)
+    # a repo gets one issue, however often its entry comes up again
+    opened_path = issue_records(ISSUES_OPENED)
+    already_opened = load_index(opened_path) if os.path.exists(opened_path) else {}
+    skipped = [entry["repo"] for entry in data if entry["repo"] in already_opened]
+    if skipped:
+        log(f"Skipping {len(skipped)} repositories with an issue already opened", "../logs.txt")
+        data = [entry for entry in data if entry["repo"] not in already_opened]
     opened_issues = []
     not_opened_issues = []
+    github_tokens = os.getenv("GITHUB_TOKENS") or os.getenv("GITHUB_TOKEN")
 
+    issue_requests = []
     for entry in data:
         owner, repo = repo_url_to_owner_repo(entry["repo"])
         issue_title = f"Cost-Related Misconfigurations Findings"
@@ -119,34 +147,31 @@ def open_issues(filename, message_type="survey"):
             issue_body = generate_issue_message_survey_plain(entry)
         elif message_type == "example":
             issue_body = generate_issue_message_example(entry)
-        github_token = os.getenv("GITHUB_TOKEN")
-
-        try:
-            url = f"https://api.github.com/repos/{owner}/{repo}/issues"
-            headers = {
-                "Authorization": f"token {github_token}",
-                "Accept": "application/vnd.github+json"
-            }
-
-            response = requests.post(url, json={
-                "title": issue_title,
-                "body": issue_body
-            }, headers=headers)
-
-            if response.status_code == 201:
-                log(f"\tIssue created successfully for {entry['repo']}", "data/gh_issues/logs.txt")
-                opened_issues.append(entry["repo"])
-            else:
-                log(f"\tFailed to create issue for {entry['repo']}: {response.status_code} - {response.text}", "data/gh_issues/logs.txt")
-                not_opened_issues.append({
-                    "repo": entry["repo"],
-                    "error": "Issues disabled" if response.status_code == 410 else response.text
-                })
-        except Exception as e:
-            log(f"Error creating issue for {entry['repo']}: {str(e)}", "data/gh_issues/logs.txt")
+
+        issue_requests.append(("POST", f"/repos/{owner}/{repo}/issues", None, {
+            "title": issue_title,
+            "body": issue_body
+        }))
+
+    # one issue at a time: GitHub's secondary rate limits punish concurrent content creation
+    responses = request_all(issue_requests, github_tokens, concurrency=ISSUE_CONCURRENCY)
+
+    for entry, response in zip(data, responses):
+        if isinstance(response, Exception):
+            log(f"Error creating issue for {entry['repo']}: {str(response)}", "data/gh_issues/logs.txt")
+        elif response.status == 201:
+            log(f"\tIssue created successfully for {entry['repo']}", "data/gh_issues/logs.txt")
+            opened_issues.append(entry["repo"])
+        else:
+            response_text = response.data if isinstance(response.data, str) else json.dumps(response.data)
+            log(f"\tFailed to create issue for {entry['repo']}: {response.status} - {response_text}", "data/gh_issues/logs.txt")
+            not_opened_issues.append({
+                "repo": entry["repo"],
+                "error": "Issues disabled" if response.status == 410 else response_text
+            })
 
     if opened_issues:
-        add_to_file(opened_issues, "../gh_issues/issues_opened.yml")
+        record_issues(opened_issues, ISSUES_OPENED)
     if not_opened_issues:
-        add_to_file(not_opened_issues, "../gh_issues/issues_not_opened.yml")
+        record_issues(not_opened_issues, ISSUES_NOT_OPENED)
     log("\n", "../logs.txt")
\ No newline at end of file
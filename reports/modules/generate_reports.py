@@ -1,14 +1,20 @@
 import os
 import sys
+import stat
+import time
 import zipfile
 import re
+import argparse
 from urllib.parse import urlparse
+from concurrent.futures import ProcessPoolExecutor
+import yaml
 
 root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 sys.path.append(root_dir)
 from utils.logger import log
-from utils.yaml_utils import load_yaml, save_to_file, add_to_file
+from reports.modules.findings import open_findings, find_entry, find_entries
 
+REPORT_WORKERS = os.cpu_count() or 1
 
 CHECK_ID_TO_NAME = {
     "CKV_AWS_801": "DynamoDB On-Demand Billing",
@@ -71,19 +77,14 @@ CHECK_TO_RECOMMENDATIONS = {
 def sanitize_repo_url(repo_url):
     return re.sub(r'[:/\\]+', '_', repo_url)
 
-def generate_report(repo, file='../data/combined_data.yml', output_dir='../generated_reports'):
-    data = load_yaml(file)
-    entry = next((item for item in data if item.get('repo') == repo), None)
-    if not entry:
-        log(f"Repository {repo} not found in data.", "../generated_reports/logs.txt")
-        return
-    
+def write_report(entry, output_dir='../generated_reports'):
+    repo = entry['repo']
     repo_folder_name = sanitize_repo_url(repo)
     output_path = os.path.join(output_dir, repo_folder_name)
 
     if os.path.exists(output_path):
         log(f"Output directory {output_path} already exists.", "../generated_reports/logs.txt")
-        return
+        return False
     os.makedirs(output_path, exist_ok=True)
 
     linter_report_data = {
@@ -97,9 +98,6 @@ def generate_report(repo, file='../data/combined_data.yml', output_dir='../gener
         ]
     }
 
-    linter_report_path = os.path.join(output_path, 'linter_report.yml')
-    save_to_file(linter_report_data, linter_report_path)
-
     unique_check_ids = {check['check_id'] for check in entry['failed_checks']}
     check_definitions_list = []
 
@@ -116,21 +114,62 @@ def generate_report(repo, file='../data/combined_data.yml', output_dir='../gener
         })
 
     check_definitions_data = {'check_definitions': check_definitions_list}
-    check_definitions_path = os.path.join(output_path, 'check_definitions.yml')
-    save_to_file(check_definitions_data, check_definitions_path)
 
-    zip_path = os.path.join(output_path, 'report.zip')
-    with zipfile.ZipFile(zip_path, 'w') as zipf:
-        zipf.write(linter_report_path, arcname='linter_report.yml')
-        zipf.write(check_definitions_path, arcname='check_definitions.yml')
+    # each document is dumped once, the same text goes to its file and into the zip
+    documents = {
+        'linter_report.yml': yaml.dump(linter_report_data),
+        'check_definitions.yml': yaml.dump(check_definitions_data),
+    }
+    with zipfile.ZipFile(os.path.join(output_path, 'report.zip'), 'w') as zipf:
+        for name, text in documents.items():
+            with open(os.path.join(output_path, name), 'w') as file:
+                file.write(text)
+            member = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            member.external_attr = (stat.S_IFREG | 0o644) << 16
+            zipf.writestr(member, text)
 
     # save the repo URL and the form_link in info.txt
     info_path = os.path.join(output_path, 'info.txt')
     with open(info_path, 'w') as info_file:
         info_file.write(f"Repository: {repo}\n")
         info_file.write(f"Form Link: {entry.get('form_link', 'No form link available')}\n")
+    return True
+
+def generate_report(repo, file='../data/combined_data.yml', output_dir='../generated_reports'):
+    db = open_findings(file)
+    entry = find_entry(db, repo)
+    db.close()
+    if not entry:
+        log(f"Repository {repo} not found in data.", "../generated_reports/logs.txt")
+        return
+    write_report(entry, output_dir)
+
+def generate_reports(repos=None, file='../data/combined_data.yml', output_dir='../generated_reports', workers=REPORT_WORKERS,
+                     tool=None, dataset=None, cost_awareness=None):
+    # the reports of the given repos, or of every repo matching the filters, from one lookup in the findings store
+    db = open_findings(file)
+    entries = find_entries(db, repos, tool, dataset, cost_awareness)
+    db.close()
+    for repo in repos or []:
+        if repo not in entries:
+            log(f"Repository {repo} not found in data.", "../generated_reports/logs.txt")
+
+    if workers > 1 and len(entries) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            written = list(executor.map(write_report, entries.values(), [output_dir] * len(entries)))
+    else:
+        written = [write_report(entry, output_dir) for entry in entries.values()]
+    log(f"Generated {sum(written)} reports in {output_dir}, {len(written) - sum(written)} already existed.", "../generated_reports/logs.txt")
 
 if __name__ == "__main__":
-    if sys.argv[1:]:
-        repo = sys.argv[1]
-        generate_report(repo)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate the report folders of the given repositories, or of all repositories in the data file.")
+    parser.add_argument("repos", nargs="*", help="repository URLs (default: all, narrowed down by the options below)")
+    parser.add_argument("--file", default='../data/combined_data.yml')
+    parser.add_argument("--output-dir", default='../generated_reports')
+    parser.add_argument("--tool", choices=["terraform", "cloudformation"])
+    parser.add_argument("--dataset", choices=["baseline", "extended"])
+    parser.add_argument("--awareness", choices=["aware", "unaware"])
+    parser.add_argument("--workers", type=int, default=REPORT_WORKERS, help="reports written in parallel")
+    args = parser.parse_args()
+
+    generate_reports(args.repos or None, args.file, args.output_dir, args.workers, args.tool, args.dataset, args.awareness)
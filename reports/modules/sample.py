@@ -7,19 +7,16 @@ load_dotenv()
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.yaml_utils import load_yaml, save_to_file
+from reports.modules.findings import open_findings, load_entries
 
 def sample(data_file, save_file, size=4):
-    data = load_yaml(data_file)
+    db = open_findings(data_file)
 
     # Filter only baseline + terraform/cloudformation + more than 1 failed check
-    filtered = [
-        entry for entry in data
-        if (
-            # entry['dataset'] == 'baseline' and
-            entry['tool'] in ['terraform', 'cloudformation'] and
-            len(entry.get('failed_checks', [])) > 1
-        )
-    ]
+    rows = db.execute("""SELECT position, tool, cost_awareness FROM repos
+                         WHERE tool IN ('terraform', 'cloudformation') AND findings_count > 1
+                         -- AND dataset = 'baseline'
+                         ORDER BY position""")
 
     # Create buckets by (tool, awareness)
     buckets = {
@@ -29,10 +26,10 @@ def sample(data_file, save_file, size=4):
         ('cloudformation', 'unaware'): [],
     }
 
-    for entry in filtered:
-        key = (entry['tool'], entry['cost_awareness'])
+    for position, tool, cost_awareness in rows:
+        key = (tool, cost_awareness)
         if key in buckets:
-            buckets[key].append(entry)
+            buckets[key].append(position)
 
     eligible_buckets = {
         key: entries for key, entries in buckets.items() if len(entries) >= 10
@@ -40,6 +37,7 @@ def sample(data_file, save_file, size=4):
 
     if not eligible_buckets:
         print("No buckets with at least 10 entries found.")
+        db.close()
         return
     
         # Distribute `size` samples fairly among eligible buckets
@@ -57,23 +55,24 @@ def sample(data_file, save_file, size=4):
     for key in random.sample(buckets_to_sample, remainder):
         samples_per_bucket[key] += 1
 
-    selected_sample = {}
-    sampled_count = 0
+    selected = {}
 
     for key in buckets_to_sample:
-        entries = eligible_buckets[key]
-        sample_count = min(samples_per_bucket[key], len(entries))
-        samples = random.sample(entries, sample_count)
-        for i, entry in enumerate(samples):
+        positions = eligible_buckets[key]
+        sample_count = min(samples_per_bucket[key], len(positions))
+        samples = random.sample(positions, sample_count)
+        for i, position in enumerate(samples):
             label = f"{key[0]}_{key[1]}_{i}"
-            selected_sample[label] = entry
-            data.remove(entry)
-            sampled_count += 1
+            selected[label] = position
+
+    # only the sampled entries are rebuilt from the store
+    entries = load_entries(db, list(selected.values()))
+    db.close()
+    selected_sample = dict(zip(selected, entries))
 
     # Remove the sample from the original data
-    for entry in selected_sample.values():
-        if entry in data:
-            data.remove(entry)
+    sampled_positions = set(selected.values())
+    data = [entry for position, entry in enumerate(load_yaml(data_file)) if position not in sampled_positions]
 
     save_to_file(selected_sample, save_file)
     save_to_file(data, data_file)
\ No newline at end of file
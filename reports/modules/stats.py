@@ -1,69 +1,42 @@
 import sys
 import os
-from collections import defaultdict
 from dotenv import load_dotenv
 
 load_dotenv()
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from utils.yaml_utils import load_yaml, save_to_file
+from utils.yaml_utils import save_to_file
+from reports.modules.findings import COMBINED_DATA, open_findings
 
-def get_awareness_stats(data):
-    awareness_stats = defaultdict(lambda: {"aware": 0, "unaware": 0})
+# groups come out in the order of their first entry in the data file, as the old single pass produced them
 
-    for entry in data:
-        awareness_stats[entry["tool"]][entry["cost_awareness"]] += 1
-
-    result = []
-    for tool, stats in awareness_stats.items():
-        result.append({
-            "tool": tool,
-            "aware": stats["aware"],
-            "unaware": stats["unaware"],
-        })
+def get_awareness_stats(data_file=COMBINED_DATA):
+    db = open_findings(data_file)
+    rows = db.execute("""SELECT tool, SUM(cost_awareness = 'aware'), SUM(cost_awareness = 'unaware')
+                         FROM repos GROUP BY tool ORDER BY MIN(position)""")
+    result = [{"tool": tool, "aware": aware, "unaware": unaware} for tool, aware, unaware in rows]
 
     save_to_file(result, "../awareness_stats_tool.yml")
 
     # Calculate awareness stats for each dataset
-    dataset_stats = defaultdict(lambda: {"aware": 0, "unaware": 0})
-
-    for entry in data:
-        key = (entry["tool"], entry["dataset"])
-        dataset_stats[key][entry["cost_awareness"]] += 1
-    
-    result = []
-    for (tool, dataset), stats in dataset_stats.items():
-        result.append({
-            "tool": tool,
-            "dataset": dataset,
-            "aware": stats["aware"],
-            "unaware": stats["unaware"],
-        })
+    rows = db.execute("""SELECT tool, dataset, SUM(cost_awareness = 'aware'), SUM(cost_awareness = 'unaware')
+                         FROM repos GROUP BY tool, dataset ORDER BY MIN(position)""")
+    result = [{"tool": tool, "dataset": dataset, "aware": aware, "unaware": unaware} for tool, dataset, aware, unaware in rows]
+    db.close()
 
     save_to_file(result, "../awareness_stats_dataset.yml")
 
-def aggregate_totals(data):
-
-    stats = defaultdict(lambda: {
-        "total_checks": 0,
-        "unique_files": 0,
-        "total_repos": 0,
-    })
-
-    for entry in data:
-        key = (entry["tool"], entry["dataset"])
-        stats[key]["total_checks"] += entry.get("failed_checks_count", 0)
-        stats[key]["unique_files"] += entry.get("files_count", 0)
-        stats[key]["total_repos"] += 1
-
-    result = []
-    for (tool, dataset), values in stats.items():
-        result.append({
-            "tool": tool,
-            "dataset": dataset,
-            "total_checks": values["total_checks"],
-            "unique_files": values["unique_files"],
-            "total_repos": values["total_repos"],
-        })
-
-    save_to_file(result, "aggregated_totals.yml")
\ No newline at end of file
+def aggregate_totals(data_file=COMBINED_DATA):
+    db = open_findings(data_file)
+    rows = db.execute("""SELECT tool, dataset, SUM(COALESCE(failed_checks_count, 0)), SUM(COALESCE(files_count, 0)), COUNT(*)
+                         FROM repos GROUP BY tool, dataset ORDER BY MIN(position)""")
+    result = [{
+        "tool": tool,
+        "dataset": dataset,
+        "total_checks": total_checks,
+        "unique_files": unique_files,
+        "total_repos": total_repos,
+    } for tool, dataset, total_checks, unique_files, total_repos in rows]
+    db.close()
+
+    save_to_file(result, "aggregated_totals.yml")
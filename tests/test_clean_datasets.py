@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from utils.yaml_utils import load_yaml, save_to_file
+from reports.modules.clean_datasets import DATASETS, check_duplicates
+
+def run_check_duplicates(root, datasets):
+    # check_duplicates runs from reports/, reading ../results and writing raw_data/
+    for name in DATASETS:
+        path = root / "results" / name / "checkov"
+        path.mkdir(parents=True)
+        save_to_file(datasets.get(name, []), str(path / "results.yml"))
+    reports = root / "reports"
+    (reports / "raw_data").mkdir(parents=True)
+    os.chdir(reports)
+    check_duplicates()
+    return {name: load_yaml(f"raw_data/{name}.yml") for name in DATASETS}
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def entry(repo, tag):
+    return {"repo": repo, "tag": tag}
+
+def test_baselines_keep_every_entry(root):
+    result = run_check_duplicates(root, {
+        "baseline_tf": [entry("https://github.com/a/both", "tf")],
+        "baseline_cf": [entry("https://github.com/a/both", "cf")],
+    })
+    assert result["baseline_tf"] == [entry("https://github.com/a/both", "tf")]
+    assert result["baseline_cf"] == [entry("https://github.com/a/both", "cf")]
+
+def test_extended_drops_repos_of_the_baselines(root):
+    result = run_check_duplicates(root, {
+        "baseline_tf": [entry("https://github.com/a/tf", "baseline")],
+        "baseline_cf": [entry("https://github.com/a/cf", "baseline")],
+        "extended_tf": [entry("https://github.com/A/TF.git", "extended"), entry("https://github.com/a/new", "extended")],
+        "extended_cf": [entry("git@github.com:a/cf", "extended"), entry("https://github.com/a/tf/", "extended")],
+    })
+    assert result["extended_tf"] == [entry("https://github.com/a/new", "extended")]
+    assert result["extended_cf"] == []
+
+def test_repo_in_both_extended_datasets_stays_in_extended_tf(root):
+    result = run_check_duplicates(root, {
+        "extended_tf": [entry("https://github.com/a/repo", "tf")],
+        "extended_cf": [entry("https://github.com/a/repo", "cf")],
+    })
+    assert result["extended_tf"] == [entry("https://github.com/a/repo", "tf")]
+    assert result["extended_cf"] == []
+
+def test_repo_twice_in_one_extended_dataset_keeps_its_first_entry(root):
+    result = run_check_duplicates(root, {
+        "extended_cf": [entry("https://github.com/a/repo", "first"), entry("https://github.com/a/repo.git", "second")],
+    })
+    assert result["extended_cf"] == [entry("https://github.com/a/repo", "first")]
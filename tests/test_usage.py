@@ -0,0 +1,39 @@
+import pytest
+
+from utils.usage import normalize_repo_url, RepoRegistry
+
+@pytest.mark.parametrize("url", [
+    "https://github.com/owner/repo",
+    "https://github.com/Owner/Repo",
+    "https://github.com/owner/repo/",
+    "https://github.com/owner/repo.git",
+    "https://github.com/owner/repo.git/",
+    "http://github.com/owner/repo",
+    "https://www.github.com/owner/repo",
+    "github.com/owner/repo",
+    "git@github.com:owner/repo.git",
+    "ssh://git@github.com/owner/repo",
+    "owner/repo",
+    "  https://github.com/owner/repo  ",
+])
+def test_normalize_repo_url_variants(url):
+    assert normalize_repo_url(url) == "github.com/owner/repo"
+
+def test_normalize_repo_url_keeps_distinct_repos_apart():
+    assert normalize_repo_url("https://github.com/owner/repo") != normalize_repo_url("https://github.com/owner/repo2")
+    assert normalize_repo_url("https://github.com/owner/repo") != normalize_repo_url("https://github.com/other/repo")
+
+def test_repo_registry_counts_variants_as_one_repo():
+    registry = RepoRegistry()
+    assert registry.add("https://github.com/owner/repo", "baseline_tf")
+    assert not registry.add("git@github.com:Owner/Repo.git", "extended_tf")
+    assert "owner/repo" in registry
+    assert len(registry) == 1
+    assert registry.datasets("https://github.com/owner/repo/") == ["baseline_tf", "extended_tf"]
+    assert registry.duplicates() == {"https://github.com/owner/repo": ["baseline_tf", "extended_tf"]}
+
+def test_repo_registry_add_all_takes_entries_and_plain_urls():
+    registry = RepoRegistry().add_all([{"repo": "https://github.com/a/one"}, "https://github.com/a/two"], "keywords")
+    assert "https://github.com/A/One" in registry
+    assert "a/two" in registry
+    assert RepoRegistry().add_all(None, "keywords").duplicates() == {}
@@ -0,0 +1,91 @@
+import re
+import hashlib
+import yaml
+
+try:
+    from yaml import CSafeLoader as BaseLoader
+except ImportError:
+    from yaml import SafeLoader as BaseLoader
+
+# files bigger than this are only sniffed, never fully parsed
+MAX_FILE_SIZE = 2 * 1024 * 1024
+# the header and the first resources of a template are almost always in the first KBs
+SNIFF_SIZE = 64 * 1024
+
+CF_HEADER = re.compile(r'^["\']?AWSTemplateFormatVersion["\']?\s*:', re.MULTILINE)
+CF_RESOURCES = re.compile(r'^["\']?Resources["\']?\s*:', re.MULTILINE)
+CF_AWS_TYPE = re.compile(r'\bType["\']?\s*:\s*["\']?AWS::')
+# any key at the start of a line ends the block of the top-level key before it
+CF_TOP_LEVEL_KEY = re.compile(r'^["\']?\w+["\']?\s*:', re.MULTILINE)
+
+# verdicts by content hash, the same file shows up in many commits and forks
+VERDICTS = {}
+
+class CfLoader(BaseLoader):
+    pass
+
+def construct_short_form(loader, tag_suffix, node):
+    # keep !Ref, !Sub, !GetAtt, ... as plain values instead of failing on the unknown tag
+    if isinstance(node, yaml.ScalarNode):
+        return loader.construct_scalar(node)
+    if isinstance(node, yaml.SequenceNode):
+        return loader.construct_sequence(node)
+    return loader.construct_mapping(node)
+
+CfLoader.add_multi_constructor('!', construct_short_form)
+
+def has_aws_resources(template):
+    if not isinstance(template, dict) or not isinstance(template.get("Resources"), dict):
+        return False
+    for resource in template["Resources"].values():
+        if isinstance(resource, dict) and str(resource.get("Type", "")).startswith("AWS::"):
+            return True
+    return False
+
+def has_aws_type_in_resources(text):
+    # a "Type: AWS::" elsewhere, e.g. the parameter type AWS::EC2::KeyPair::KeyName, does not count
+    match = CF_RESOURCES.search(text)
+    if match is None:
+        return False
+    end = CF_TOP_LEVEL_KEY.search(text, match.end())
+    return bool(CF_AWS_TYPE.search(text, match.end(), end.start() if end else len(text)))
+
+def classify(content, truncated=False):
+    text = content.decode('utf-8', errors='replace')
+    head = text[:SNIFF_SIZE]
+    has_header = CF_HEADER.search(head) is not None
+    # no resource type and no header, no template
+    if 'AWS::' not in text and not has_header:
+        return False
+
+    if has_header and has_aws_type_in_resources(text):
+        return True
+    if truncated:
+        return has_aws_type_in_resources(text)
+
+    try:
+        return has_aws_resources(yaml.load(text, Loader=CfLoader))
+    except Exception:
+        # not only YAMLError: constructors raise e.g. ValueError for a date like 2024-13-45
+        if text.startswith("AWSTemplateFormatVersion: 2010-09-09"):
+            return True
+        return "Resources" in text and "AWS::" in text
+
+def is_cf_content(content):
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    # callers read at most MAX_FILE_SIZE + 1 bytes, anything longer is cut and only sniffed
+    truncated = len(content) > MAX_FILE_SIZE
+    content = content[:MAX_FILE_SIZE]
+    key = (truncated, hashlib.blake2b(content, digest_size=16).digest())
+    if key not in VERDICTS:
+        VERDICTS[key] = classify(content, truncated)
+    return VERDICTS[key]
+
+def is_cf_file(file_path):
+    try:
+        with open(file_path, 'rb') as file:
+            content = file.read(MAX_FILE_SIZE + 1)
+    except OSError:
+        return False
+    return is_cf_content(content)
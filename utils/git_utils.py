@@ -0,0 +1,133 @@
+import os
+import re
+import time
+import stat
+import shutil
+import signal
+import subprocess
+
+SPARSE_PATTERNS = ['*.tf', '*.yaml', '*.yml']
+
+class GitError(Exception):
+    pass
+
+class GitTimeout(GitError):
+    pass
+
+def kill_process_tree(process):
+    # git forks helpers (git-remote-https, index-pack), killing only the parent would leave them running
+    if os.name == 'posix':
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            # the group exited between the timeout and the kill
+            pass
+    else:
+        subprocess.run(['taskkill', '/F', '/T', '/PID', str(process.pid)], capture_output=True)
+
+def run_git(args, timeout=None):
+    env = dict(os.environ, GIT_TERMINAL_PROMPT='0')
+    if os.name == 'posix':
+        group = {'start_new_session': True}
+    else:
+        group = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+
+    process = subprocess.Popen(['git'] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors='replace', env=env, **group)
+    try:
+        output, error = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        kill_process_tree(process)
+        process.communicate()
+        raise GitTimeout(f"git {args[0]} killed after {timeout:.0f} seconds")
+
+    if process.returncode != 0:
+        raise GitError(f"git {args[0]} failed: {error.strip()}")
+    return output
+
+def remaining(deadline):
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise GitTimeout("clone deadline exceeded")
+    return left
+
+def get_remote_head(repo_url, timeout=60):
+    # resolve the commit HEAD points to without cloning the repository
+    output = run_git(['ls-remote', repo_url, 'HEAD'], timeout)
+    if not output:
+        return None
+    return output.split()[0]
+
+def get_checkout_info(repo_dir):
+    # the exact commit that was checked out and the branch it came from
+    commit = run_git(['-C', repo_dir, 'rev-parse', 'HEAD']).strip()
+    try:
+        branch = run_git(['-C', repo_dir, 'symbolic-ref', '--short', 'HEAD']).strip()
+    except GitError:
+        branch = None
+    return commit, branch
+
+def force_remove_readonly(func, path, _):
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+def remove_dir(path):
+    shutil.rmtree(path, onerror=force_remove_readonly)
+
+def fetch_history(repo_url, history_dir, since=None, depth=None, timeout=1800):
+    # bare and blobless: commits and trees only, blobs are fetched on demand when they are read
+    deadline = time.monotonic() + timeout
+    args = ['clone', '--bare', '--filter=blob:none']
+    if since is not None:
+        args.append(f'--shallow-since={since:%Y-%m-%d %H:%M:%S}')
+    elif depth is not None:
+        args.append(f'--depth={depth}')
+    run_git(args + [repo_url, history_dir], remaining(deadline))
+    if since is not None or depth is not None:
+        # one more level of history, otherwise the oldest commit would list every file as added
+        run_git(['--git-dir', history_dir, 'fetch', '--deepen=1', 'origin'], remaining(deadline))
+
+def read_blob(history_dir, blob_sha, timeout=300):
+    return run_git(['--git-dir', history_dir, 'cat-file', 'blob', blob_sha], timeout)
+
+def get_mirror_path(repo_url, mirrors_dir):
+    name = re.sub(r'[:/\\]+', '_', repo_url.rstrip('/'))
+    return os.path.join(mirrors_dir, name + '.git')
+
+def update_mirror(repo_url, mirrors_dir, deadline=None):
+    # one bare mirror per URL: the first run clones it, later runs only fetch what is new
+    mirror = get_mirror_path(repo_url, mirrors_dir)
+    if os.path.isdir(mirror):
+        run_git(['--git-dir', mirror, 'remote', 'update', '--prune'], remaining(deadline))
+        return mirror
+
+    os.makedirs(mirrors_dir, exist_ok=True)
+    partial = mirror + '.partial'
+    shutil.rmtree(partial, ignore_errors=True)
+    run_git(['clone', '--mirror', repo_url, partial], remaining(deadline))
+    os.replace(partial, mirror)
+    return mirror
+
+def clone_repo(repo_url, repo_dir, clone_mode='full', mirrors_dir=None, timeout=1800):
+    deadline = time.monotonic() + timeout
+    sparse = clone_mode == 'sparse'
+
+    if mirrors_dir:
+        # the checkout only borrows the mirror's objects, nothing goes over the network
+        source = update_mirror(repo_url, mirrors_dir, deadline)
+        args = ['clone', '--shared']
+    else:
+        source = repo_url
+        args = ['clone', '--depth=1']
+        if sparse:
+            # partial clone: only the blobs of the files matched by the sparse patterns are downloaded
+            args.append('--filter=blob:none')
+
+    if not sparse:
+        run_git(args + [source, repo_dir], remaining(deadline))
+        return
+
+    run_git(args + ['--no-checkout', source, repo_dir], remaining(deadline))
+    run_git(['-C', repo_dir, 'sparse-checkout', 'set', '--no-cone'] + SPARSE_PATTERNS, remaining(deadline))
+    run_git(['-C', repo_dir, 'checkout'], remaining(deadline))
@@ -0,0 +1,160 @@
+import os
+import json
+import asyncio
+import hashlib
+from collections import namedtuple
+
+import aiohttp
+from multidict import CIMultiDict
+
+from utils.rate_limit import RateLimiter
+from utils.github_utils import split_tokens
+
+API_URL = "https://api.github.com"
+# requests in flight at once, also the size of the connection pool
+CONCURRENCY = 8
+# validators and bodies of earlier GET responses, so unchanged resources come back as 304
+ETAG_CACHE_DIR = '.cache/etags'
+RETRY_STATUSES = {500, 502, 503, 504}
+# a server error or timeout may come after GitHub acted on the request: only these are sent again,
+# a retried POST could e.g. open the same issue twice; rate limited requests were not acted on and always are
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+MAX_RETRIES = 5
+
+Response = namedtuple('Response', ['status', 'headers', 'data', 'cached'])
+
+class GithubRequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"{status} - {message}")
+        self.status = status
+        self.message = message
+
+def cache_key(url, params):
+    # shared by all configured tokens, requests rotate between them
+    key = json.dumps([url, sorted((params or {}).items())])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+def load_cached(cache_dir, key):
+    try:
+        with open(os.path.join(cache_dir, key + '.json')) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+def store_cached(cache_dir, key, entry):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key + '.json')
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as file:
+        json.dump(entry, file)
+    os.replace(temp_path, path)
+
+def parse_body(text, headers):
+    if 'json' in headers.get('Content-Type', ''):
+        return json.loads(text) if text else None
+    return text
+
+class GithubClient:
+    # one pooled aiohttp session; use as "async with GithubClient(tokens) as client"
+    def __init__(self, tokens=None, concurrency=CONCURRENCY, cache_dir=ETAG_CACHE_DIR, timeout=60):
+        self.limiter = RateLimiter(split_tokens(tokens) if tokens else [None])
+        self.concurrency = concurrency
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.session = None
+        self.semaphore = None
+        self.stats = {"requests": 0, "not_modified": 0, "rate_limited": 0}
+
+    async def __aenter__(self):
+        headers = {"Accept": "application/vnd.github+json"}
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(headers=headers, connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def request(self, method, url, params=None, payload=None):
+        if url.startswith('/'):
+            url = API_URL + url
+
+        # only reads are conditional, a 304 does not count against the rate limit
+        cached = None
+        headers = {}
+        if method == "GET" and self.cache_dir:
+            key = cache_key(url, params)
+            cached = load_cached(self.cache_dir, key)
+            if cached and cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            elif cached and cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        retries = MAX_RETRIES if method in IDEMPOTENT_METHODS else 0
+        async with self.semaphore:
+            attempt = 0
+            while True:
+                # waits here only if every token is limited, other requests keep going meanwhile
+                bucket = await self.limiter.acquire_async()
+                request_headers = dict(headers)
+                if bucket.token:
+                    request_headers["Authorization"] = f"token {bucket.token}"
+                try:
+                    self.stats["requests"] += 1
+                    async with self.session.request(method, url, params=params, json=payload, headers=request_headers) as response:
+                        status = response.status
+                        response_headers = CIMultiDict(response.headers)
+                        text = await response.text()
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    if attempt == retries:
+                        raise
+                else:
+                    if bucket.update(status, response_headers, text):
+                        self.stats["rate_limited"] += 1
+                        continue
+                    if status not in RETRY_STATUSES or attempt == retries:
+                        break
+                await asyncio.sleep(2 ** attempt)
+                attempt += 1
+
+        if status == 304 and cached:
+            self.stats["not_modified"] += 1
+            cached_headers = CIMultiDict(cached["headers"])
+            return Response(cached["status"], cached_headers, parse_body(cached["body"], cached_headers), True)
+
+        if method == "GET" and self.cache_dir and status == 200:
+            validators = {
+                "etag": response_headers.get("ETag"),
+                "last_modified": response_headers.get("Last-Modified")
+            }
+            if validators["etag"] or validators["last_modified"]:
+                # Link is kept for pagination, Content-Type to decode the body again
+                kept_headers = {name: response_headers[name] for name in ("Content-Type", "Link") if name in response_headers}
+                store_cached(self.cache_dir, key, dict(validators, status=status, headers=kept_headers, body=text))
+
+        return Response(status, response_headers, parse_body(text, response_headers), False)
+
+    async def get_json(self, url, params=None):
+        response = await self.request("GET", url, params=params)
+        if response.status != 200:
+            raise GithubRequestError(response.status, response.data)
+        return response
+
+    async def post_json(self, url, payload):
+        return await self.request("POST", url, payload=payload)
+
+def run_with_client(func, tokens=None, concurrency=CONCURRENCY, cache_dir=ETAG_CACHE_DIR):
+    # sync entry point: func(client) is a coroutine function, its result is returned
+    async def main():
+        async with GithubClient(tokens, concurrency, cache_dir) as client:
+            return await func(client)
+    return asyncio.run(main())
+
+def request_all(requests, tokens=None, concurrency=CONCURRENCY, cache_dir=ETAG_CACHE_DIR):
+    # requests are (method, url, params, payload) tuples; results keep their order, failures are returned as exceptions
+    async def send(client):
+        return await asyncio.gather(*(client.request(*request) for request in requests), return_exceptions=True)
+    return run_with_client(send, tokens, concurrency, cache_dir)
+
+def get_json_many(urls, tokens=None, concurrency=CONCURRENCY, cache_dir=ETAG_CACHE_DIR):
+    return request_all([("GET", url, None, None) for url in urls], tokens, concurrency, cache_dir)
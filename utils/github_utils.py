@@ -1,32 +1,111 @@
 from github import Github
-import datetime
+from requests.structures import CaseInsensitiveDict
+import threading
+import weakref
 import time
 import sys
 
 from utils.logger import log
+from utils.rate_limit import RateLimiter
+
+# the pool of a client passed without one, its buckets outlive a single github_limit call
+POOLS = weakref.WeakKeyDictionary()
+POOLS_LOCK = threading.Lock()
+
+def watch_rate_limits(client, bucket):
+    # every response of the client updates its bucket; a rate limited request (Retry-After, secondary limit,
+    # exhausted count) is sent again once the bucket allows it, as the asyncio client does
+    requester = client.requester
+    send = getattr(requester, "_Requester__requestEncode", None)
+    if send is None:
+        return
+
+    def request_encode(*args, **kwargs):
+        while True:
+            status, headers, output = send(*args, **kwargs)
+            if not bucket.update(status, CaseInsensitiveDict(headers), output if isinstance(output, str) else ""):
+                return status, headers, output
+            wait = max(bucket.ready_at(0) - time.time(), 0)
+            log(f"Rate limited ({status}), retrying in {wait:.0f} seconds.", level="WARNING")
+            time.sleep(wait)
+
+    requester._Requester__requestEncode = request_encode
+
+class GithubPool:
+    # one PyGithub client per token behind a single object, github_limit chooses the one the next calls go through
+    def __init__(self, clients, tokens):
+        self.clients = dict(zip(tokens, clients))
+        self.limiter = RateLimiter(tokens)
+        self.current = clients[0]
+        # threads of the pipeline share a pool, the choice of the current client is made by one at a time
+        self.lock = threading.Lock()
+        for bucket in self.limiter.buckets:
+            watch_rate_limits(self.clients[bucket.token], bucket)
+
+    def __getattr__(self, name):
+        return getattr(self.current, name)
+
+    def sync(self):
+        # PyGithub keeps the X-RateLimit-* headers of the last response, no request needed
+        remaining, limit = self.current.requester.rate_limiting
+        if limit < 0:
+            return
+        for bucket in self.limiter.buckets:
+            if self.clients[bucket.token] is self.current:
+                bucket.set_limits(remaining, limit, self.current.requester.rate_limiting_resettime)
+
+def split_tokens(token):
+    # several tokens can be given as a list or comma-separated, e.g. GITHUB_TOKENS=tok1,tok2
+    if isinstance(token, str):
+        return [part.strip() for part in token.split(",") if part.strip()]
+    return list(token)
 
 def github_connect(token):
     try:
-        github_client = Github(login_or_token=token, per_page=100)
+        tokens = split_tokens(token)
+        clients = [Github(login_or_token=token, per_page=100) for token in tokens]
 
-        user = github_client.get_user()
-        log(f"Connected to GitHub as {user.login}")
-        return github_client
+        for client in clients:
+            user = client.get_user()
+            log(f"Connected to GitHub as {user.login}")
+        return GithubPool(clients, tokens)
     
     except Exception as e:
         log(f"Error connecting to GitHub: {e}")
         sys.exit(1)
 
+def github_tokens(github_client):
+    # the tokens behind a client, for clients that talk to the API directly
+    if isinstance(github_client, GithubPool):
+        return list(github_client.clients)
+    token = getattr(github_client.requester.auth, "token", None)
+    return [token] if token else [None]
+
+def github_pool(github_client):
+    if isinstance(github_client, GithubPool):
+        return github_client
+    with POOLS_LOCK:
+        if github_client not in POOLS:
+            POOLS[github_client] = GithubPool([github_client], github_tokens(github_client))
+        return POOLS[github_client]
+
 def github_limit(github_client, log_file):
+    # switches a pool to the token with the most requests left; waits only when every token is below the reserve
+    github_client = github_pool(github_client)
+
     try:
-        rate_limit = github_client.get_rate_limit().core
-        log(f"Remaining requests: {rate_limit.remaining}", log_file)
+        with github_client.lock:
+            github_client.sync()
+            bucket, wait = github_client.limiter.pick()
+        if wait > 0:
+            log(f"Rate limit reached on all {len(github_client.clients)} token(s). Reset in {wait:.0f} seconds.", log_file)
+            time.sleep(wait)
+            bucket = github_client.limiter.acquire()
+        with github_client.lock:
+            github_client.current = github_client.clients[bucket.token]
+        if bucket.remaining is not None:
+            log(f"Remaining requests: {bucket.remaining}", log_file)
 
-        if rate_limit.remaining <= 250:
-            reset_time = rate_limit.reset.timestamp() - datetime.datetime.now().timestamp()
-            log(f"Rate limit exceeded. Reset in {reset_time} seconds.", log_file)
-            time.sleep(reset_time + 10)
-    
     except Exception as e:
-        log(f"Error fetching rate limit: {e}", log_file)
-        sys.exit(1)
\ No newline at end of file
+        log(f"Error checking rate limit: {e}", log_file)
+    return github_client.current
@@ -0,0 +1,207 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from github.Requester import Requester, HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass
+
+from utils.logger import log
+
+HTTP_CACHE_PATH = '.cache/http_cache.sqlite'
+MAX_CACHE_SIZE = 1024 * 1024 * 1024
+# larger bodies are passed through
+MAX_ENTRY_SIZE = 2 * 1024 * 1024
+
+# seconds an entry stays fresh, first match wins; None never expires, 0 is never stored
+TTLS = [
+    (re.compile(r'/repos/[^/]+/[^/]+/commits/[0-9a-f]{40}(\?|$)'), None),
+    (re.compile(r'/repos/[^/]+/[^/]+/git/(blobs|trees|commits)/[0-9a-f]{40}'), None),
+    (re.compile(r'//raw\.githubusercontent\.com/[^/]+/[^/]+/[0-9a-f]{40}/'), None),
+    (re.compile(r'/(rate_limit|user)(\?|$)'), 0),
+    (re.compile(r'/repos/[^/]+/[^/]+/(commits|issues|pulls)'), 6 * 3600),
+    (re.compile(r'/repos/[^/]+/[^/]+/?(\?|$)'), 24 * 3600),
+]
+DEFAULT_TTL = 3600
+# listings are asked for "since" a cutoff computed to the second; within a listing's TTL the same day's
+# cutoff is answered from the same entry, the few seconds at the old end of the window make no difference
+SINCE = re.compile(r'([?&]since=\d{4}-\d{2}-\d{2})[^&]*')
+
+# not replayed: the body is stored decoded, and the rate limit counts belong to the original response
+DROPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'x-ratelimit-limit',
+                   'x-ratelimit-remaining', 'x-ratelimit-reset', 'x-ratelimit-used', 'x-ratelimit-resource'}
+
+CACHE = None
+
+def cache_key(url):
+    return SINCE.sub(r'\1', url)
+
+def get_ttl(url):
+    for pattern, ttl in TTLS:
+        if pattern.search(url):
+            return ttl
+    return DEFAULT_TTL
+
+class ResponseCache:
+    # GET responses by URL in SQLite, least recently used entries go first once the size limit is reached
+    def __init__(self, path=HTTP_CACHE_PATH, max_size=MAX_CACHE_SIZE):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "stored": 0, "evicted": 0}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS responses (
+            url TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB,
+            expires REAL, last_used REAL, size INTEGER)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.size = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, url):
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT status, headers, body, expires FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            status, headers, body, expires = row
+            if expires is not None and expires < now:
+                self.stats["expired"] += 1
+                return None
+            self.db.execute("UPDATE responses SET last_used = ? WHERE url = ?", (now, url))
+            self.db.commit()
+            self.stats["hits"] += 1
+        return status, json.loads(headers), body
+
+    def put(self, url, status, headers, body, ttl):
+        now = time.time()
+        expires = None if ttl is None else now + ttl
+        headers = {name: value for name, value in headers.items() if name.lower() not in DROPPED_HEADERS}
+        with self.lock:
+            old = self.db.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (url, status, json.dumps(headers), body, expires, now, len(body)))
+            self.size += len(body) - (old[0] if old else 0)
+            self.stats["stored"] += 1
+            self.evict()
+            self.db.commit()
+
+    def evict(self):
+        # down to 90% so that not every insert past the limit pays for an eviction
+        if self.size <= self.max_size:
+            return
+        target = self.max_size * 0.9
+        rows = self.db.execute("SELECT url, size FROM responses ORDER BY last_used").fetchall()
+        for url, size in rows:
+            if self.size <= target:
+                break
+            self.db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self.size -= size
+            self.stats["evicted"] += 1
+
+    def summary(self):
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["expired"]
+        hit_rate = self.stats["hits"] / lookups if lookups else 0
+        return f"HTTP cache: {self.stats['hits']} hits, {self.stats['misses']} misses, {self.stats['expired']} expired ({hit_rate:.0%} hit rate), {self.stats['stored']} stored, {self.stats['evicted']} evicted, {self.size / 1024 / 1024:.1f} MB"
+
+    def close(self):
+        self.db.close()
+
+def cached_response(request, status, headers, body):
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response._content_consumed = True
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.reason = "OK"
+    response.url = request.url
+    response.request = request
+    return response
+
+class CachingAdapter(HTTPAdapter):
+    # a plain HTTPAdapter until enable_http_cache() is called
+    def send(self, request, **kwargs):
+        cache = CACHE
+        # streamed responses are read through response.raw, which a cached body cannot serve; read_raw_file
+        # keeps its own cache by blob SHA
+        if cache is None or request.method != "GET" or kwargs.get("stream"):
+            return super().send(request, **kwargs)
+        ttl = get_ttl(request.url)
+        if ttl == 0:
+            return super().send(request, **kwargs)
+
+        key = cache_key(request.url)
+        entry = cache.get(key)
+        if entry is not None:
+            return cached_response(request, *entry)
+
+        response = super().send(request, **kwargs)
+        if response.status_code != 200:
+            return response
+        if len(response.content) <= MAX_ENTRY_SIZE:
+            cache.put(key, response.status_code, response.headers, response.content, ttl)
+        return response
+
+# one adapter and session for all PyGithub requests: once classes are injected PyGithub creates a connection
+# object per request, which must not build a Session of its own
+GITHUB_ADAPTER = CachingAdapter(pool_connections=10, pool_maxsize=10)
+GITHUB_SESSION = None
+SESSION_LOCK = threading.Lock()
+
+def github_session(retry):
+    # the retry policy of the first connection is kept, PyGithub clients are all created with the same one
+    global GITHUB_SESSION
+    with SESSION_LOCK:
+        if GITHUB_SESSION is None:
+            GITHUB_ADAPTER.max_retries = requests.adapters.Retry.from_int(requests.adapters.DEFAULT_RETRIES if retry is None else retry)
+            GITHUB_SESSION = requests.Session()
+            GITHUB_SESSION.auth = Requester.noopAuth
+            GITHUB_SESSION.mount("https://", GITHUB_ADAPTER)
+            GITHUB_SESSION.mount("http://", GITHUB_ADAPTER)
+    return GITHUB_SESSION
+
+class CachedHTTPSConnection(HTTPSRequestsConnectionClass):
+    PROTOCOL = "https"
+    DEFAULT_PORT = 443
+
+    def __init__(self, host, port=None, strict=False, timeout=None, retry=None, pool_size=None, **kwargs):
+        # the parent's attributes, without its Session and adapter
+        self.host = host
+        self.port = port if port else self.DEFAULT_PORT
+        self.protocol = self.PROTOCOL
+        self.timeout = timeout
+        self.verify = kwargs.get("verify", True)
+        self.session = github_session(retry)
+
+    def close(self):
+        # the session is shared and outlives this connection
+        pass
+
+class CachedHTTPConnection(CachedHTTPSConnection):
+    PROTOCOL = "http"
+    DEFAULT_PORT = 80
+
+def enable_http_cache(path=HTTP_CACHE_PATH, max_size=MAX_CACHE_SIZE):
+    # opt-in for the activity stage: PyGithub and the sessions that mount a CachingAdapter share one cache
+    global CACHE
+    if CACHE is None:
+        CACHE = ResponseCache(path, max_size)
+        Requester.injectConnectionClasses(CachedHTTPConnection, CachedHTTPSConnection)
+    return CACHE
+
+def disable_http_cache():
+    global CACHE
+    if CACHE is not None:
+        CACHE.close()
+        CACHE = None
+        Requester.resetConnectionClasses()
+
+def log_http_cache(log_file):
+    if CACHE is not None:
+        log(CACHE.summary(), log_file)
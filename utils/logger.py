@@ -1,9 +1,126 @@
 import os
+import sys
+import json
+import queue
+import atexit
+import threading
+import time
+from datetime import datetime, timezone
+from multiprocessing import util as multiprocessing_util
 
-def log(message, log_path=None):
-    if log_path is None:
-        base_dir = os.path.dirname(__file__)
-        log_path = os.path.abspath(os.path.join(base_dir, "..", "logs.txt"))
+DEFAULT_LOG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "logs.txt"))
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+# messages below this level are dropped before they reach the queue
+LOG_LEVEL = LEVELS.get(os.getenv("LOG_LEVEL", "INFO").upper(), LEVELS["INFO"])
+# lines written per batch at most, a flush request waits for at most one batch before it
+BATCH_SIZE = 1000
 
-    with open(log_path, 'a') as file:
-        file.write(message + '\n')
\ No newline at end of file
+encode = json.encoder.encode_basestring_ascii
+# formatted timestamp of the current second, only the writer thread uses it
+SECONDS = {}
+
+# one background writer per process: log() only enqueues, the writer keeps the files open and writes
+# whatever has queued up since its last batch with one write and flush per file
+QUEUE = None
+WRITER = None
+WRITER_LOCK = threading.Lock()
+# the first write error since the last flush, raised by flush(); each failing path is reported on stderr once
+WRITE_ERROR = None
+
+def format_record(created, level, repo, stage, message):
+    # the same as json.dumps of the record, built by hand: this runs once per line
+    second = int(created)
+    if second not in SECONDS:
+        SECONDS.clear()
+        SECONDS[second] = datetime.fromtimestamp(second, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    line = f'{{"time": "{SECONDS[second]}.{int((created - second) * 1000):03d}+00:00", "level": "{level}"'
+    if repo is not None:
+        line += f', "repo": {encode(repo)}'
+    if stage is not None:
+        line += f', "stage": {encode(stage)}'
+    return f'{line}, "message": {encode(str(message))}}}\n'
+
+def write_loop(messages):
+    global WRITE_ERROR
+    files = {}
+    failed = set()
+    try:
+        while True:
+            batch = [messages.get()]
+            try:
+                while len(batch) < BATCH_SIZE:
+                    batch.append(messages.get_nowait())
+            except queue.Empty:
+                pass
+
+            lines = {}
+            flushed = []
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    flushed.append(item)
+                else:
+                    lines.setdefault(item[0], []).append(format_record(*item[1:]))
+
+            for log_path, path_lines in lines.items():
+                try:
+                    if log_path not in files:
+                        files[log_path] = open(log_path, 'a')
+                    files[log_path].write(''.join(path_lines))
+                    files[log_path].flush()
+                except OSError as e:
+                    # e.g. the directory of the log is gone, the file is opened again on the next message
+                    files.pop(log_path, None)
+                    if log_path not in failed:
+                        failed.add(log_path)
+                        sys.stderr.write(f"Could not write {len(path_lines)} log line(s) to {log_path}: {e}\n")
+                    if WRITE_ERROR is None:
+                        WRITE_ERROR = e
+            for event in flushed:
+                event.set()
+    finally:
+        for file in files.values():
+            file.close()
+
+def start_writer():
+    global QUEUE, WRITER
+    with WRITER_LOCK:
+        if WRITER is None:
+            QUEUE = queue.SimpleQueue()
+            WRITER = threading.Thread(target=write_loop, args=(QUEUE,), name="log-writer", daemon=True)
+            WRITER.start()
+            # pool workers leave through os._exit, which skips atexit but runs multiprocessing's finalizers
+            multiprocessing_util.Finalize(None, flush, exitpriority=100)
+    return QUEUE
+
+def reset_after_fork():
+    # the parent's writer thread does not exist in a forked child, the child starts its own on first use
+    global QUEUE, WRITER, WRITER_LOCK, WRITE_ERROR
+    QUEUE = None
+    WRITER = None
+    WRITER_LOCK = threading.Lock()
+    WRITE_ERROR = None
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+def flush(timeout=10):
+    # returns once everything logged before the call is written, raises the first write error since the last flush
+    global WRITE_ERROR
+    messages, writer = QUEUE, WRITER
+    if writer is None or not writer.is_alive():
+        return
+    event = threading.Event()
+    messages.put(event)
+    event.wait(timeout)
+    error, WRITE_ERROR = WRITE_ERROR, None
+    if error is not None:
+        raise error
+
+atexit.register(flush)
+
+def log(message, log_path=None, level="INFO", repo=None, stage=None):
+    if LEVELS.get(level, LEVELS["INFO"]) < LOG_LEVEL:
+        return
+    # resolved now, relative paths belong to the working directory of the caller
+    log_path = DEFAULT_LOG_PATH if log_path is None else os.path.abspath(log_path)
+    # formatted by the writer, the caller only pays for the enqueue
+    start_writer().put((log_path, time.time(), level, repo, stage, message))
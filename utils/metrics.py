@@ -0,0 +1,57 @@
+import json
+import math
+import time
+from contextlib import contextmanager
+
+@contextmanager
+def timed(metrics, phase):
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        phases = metrics.setdefault('phases', {})
+        phases[phase] = phases.get(phase, 0) + time.monotonic() - start
+
+def append_metrics(metrics, metrics_file):
+    with open(metrics_file, 'a') as file:
+        file.write(json.dumps(metrics) + '\n')
+
+def load_metrics(metrics_file):
+    records = []
+    with open(metrics_file, 'r') as file:
+        for line in file:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+def percentile(values, pct):
+    # nearest-rank percentile, good enough for a few thousand repos
+    if not values:
+        return 0
+    values = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(values)) - 1)
+    return values[index]
+
+def summarize_metrics(records, slowest=10):
+    phases = {}
+    for record in records:
+        for phase, seconds in record.get('phases', {}).items():
+            phases.setdefault(phase, []).append(seconds)
+
+    summary = {'repos': len(records), 'phases': {}}
+    for phase, values in phases.items():
+        summary['phases'][phase] = {
+            'p50': round(percentile(values, 50), 3),
+            'p95': round(percentile(values, 95), 3),
+            'max': round(max(values), 3),
+            'total': round(sum(values), 3)
+        }
+
+    ranked = sorted(records, key=lambda record: sum(record.get('phases', {}).values()), reverse=True)
+    summary['slowest_repos'] = [
+        {'repo': record['repo'], 'seconds': round(sum(record.get('phases', {}).values()), 3)}
+        for record in ranked[:slowest]
+    ]
+    return summary
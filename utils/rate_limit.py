@@ -0,0 +1,91 @@
+import time
+import asyncio
+import threading
+
+# requests left untouched on every token, as the old github_limit did
+RESERVE = 250
+# seconds added after a reset before the token is used again, the reset time is rounded by GitHub
+RESET_MARGIN = 10
+# wait after a secondary rate limit that came without Retry-After, as GitHub recommends
+SECONDARY_WAIT = 60
+
+class TokenBucket:
+    # what the last response said about one credential
+    def __init__(self, token):
+        self.token = token
+        self.limit = None
+        self.remaining = None
+        self.reset = 0.0
+        self.blocked_until = 0.0
+
+    def ready_at(self, reserve):
+        ready = self.blocked_until
+        if self.remaining is not None and self.remaining <= reserve:
+            ready = max(ready, self.reset + RESET_MARGIN)
+        return ready
+
+    def set_limits(self, remaining, limit, reset):
+        self.remaining = remaining
+        self.limit = limit
+        self.reset = reset
+
+    def update(self, status, headers, message=""):
+        # returns True when the response was a rate limit error and the request has to be sent again
+        if headers.get('X-RateLimit-Remaining') is not None:
+            self.set_limits(
+                int(headers['X-RateLimit-Remaining']),
+                int(headers.get('X-RateLimit-Limit', self.limit or 0)),
+                float(headers.get('X-RateLimit-Reset', self.reset))
+            )
+
+        if status not in (403, 429):
+            return False
+        retry_after = headers.get('Retry-After')
+        if retry_after is not None:
+            self.blocked_until = time.time() + int(retry_after)
+        elif self.remaining == 0:
+            self.blocked_until = self.reset + RESET_MARGIN
+        elif 'rate limit' in str(message).lower():
+            # secondary (abuse) limit: the primary count can still be high
+            self.blocked_until = time.time() + SECONDARY_WAIT
+        else:
+            # a plain 403, e.g. no access to the repository
+            return False
+        return True
+
+class RateLimiter:
+    # hands out the credential that can be used soonest; only the caller that gets a wait has to sleep
+    def __init__(self, tokens, reserve=RESERVE):
+        self.buckets = [TokenBucket(token) for token in tokens]
+        self.reserve = reserve
+        self.lock = threading.Lock()
+
+    def pick(self):
+        with self.lock:
+            now = time.time()
+
+            def order(bucket):
+                # unknown counts first so every token gets its headers, then the most requests left
+                remaining = float('inf') if bucket.remaining is None else bucket.remaining
+                return max(bucket.ready_at(self.reserve), now), -remaining
+
+            bucket = min(self.buckets, key=order)
+            wait = max(bucket.ready_at(self.reserve) - now, 0)
+            if wait == 0 and bucket.remaining is not None:
+                # counted now, concurrent callers should not all see the same remaining
+                bucket.remaining -= 1
+            return bucket, wait
+
+    def acquire(self):
+        while True:
+            bucket, wait = self.pick()
+            if wait == 0:
+                return bucket
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        while True:
+            bucket, wait = self.pick()
+            if wait == 0:
+                return bucket
+            await asyncio.sleep(wait)
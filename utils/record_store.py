@@ -0,0 +1,204 @@
+import os
+import sys
+import gzip
+import json
+import struct
+import argparse
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from utils.yaml_utils import load_yaml, save_to_file
+
+# a record file: MAGIC, a length-prefixed JSON header (format version, codec, schema), then one
+# length-prefixed compressed frame of JSON lines per append; "<file>.idx" maps each repo to its frame
+MAGIC = b'RECORDS\n'
+VERSION = 1
+LENGTH = struct.Struct('>I')
+
+class RecordStoreError(Exception):
+    pass
+
+def default_codec():
+    return 'zstd' if zstandard is not None else 'gzip'
+
+def compress(codec, data):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RecordStoreError("zstandard is not installed, cannot write a zstd record file")
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, mtime=0)
+
+def decompress(codec, data):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RecordStoreError("zstandard is not installed, cannot read a zstd record file")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+def record_key(record):
+    # URL lists hold the repo itself, the other outputs a dict with a "repo" field
+    if isinstance(record, dict):
+        return record.get('repo')
+    return record if isinstance(record, str) else None
+
+def read_header(file):
+    if file.read(len(MAGIC)) != MAGIC:
+        raise RecordStoreError(f"{file.name} is not a record file")
+    length, = LENGTH.unpack(file.read(LENGTH.size))
+    return json.loads(file.read(length)), file.tell()
+
+def read_frame(file, codec):
+    # None at the end of the file, and for a frame cut short by a crash during its append
+    prefix = file.read(LENGTH.size)
+    if len(prefix) < LENGTH.size:
+        return None
+    length, = LENGTH.unpack(prefix)
+    payload = file.read(length)
+    if len(payload) < length:
+        return None
+    return [json.loads(line) for line in decompress(codec, payload).splitlines()]
+
+def open_locked(path):
+    # appends from several processes (worker pools, parallel datasets) go one at a time
+    file = open(path, 'a+b')
+    if fcntl is not None:
+        fcntl.flock(file, fcntl.LOCK_EX)
+    return file
+
+def valid_end(file, data_start):
+    # end of the last complete frame, only the length prefixes are read
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    offset = data_start
+    while offset + LENGTH.size <= size:
+        file.seek(offset)
+        length, = LENGTH.unpack(file.read(LENGTH.size))
+        if offset + LENGTH.size + length > size:
+            break
+        offset += LENGTH.size + length
+    return offset
+
+def append_records(path, records, schema=None, codec=None):
+    records = list(records)
+    if not records:
+        return
+    with open_locked(path) as file:
+        file.seek(0, os.SEEK_END)
+        if file.tell() == 0:
+            header = {'version': VERSION, 'codec': codec or default_codec(), 'schema': schema}
+            encoded = json.dumps(header).encode()
+            file.write(MAGIC + LENGTH.pack(len(encoded)) + encoded)
+            file.flush()
+        else:
+            file.seek(0)
+            header, data_start = read_header(file)
+            if schema is not None and header['schema'] != schema:
+                raise RecordStoreError(f"{path} holds '{header['schema']}' records, not '{schema}'")
+            # drop a frame left half-written by a crash, the new one would be unreadable behind it
+            end = valid_end(file, data_start)
+            if end != file.seek(0, os.SEEK_END):
+                file.truncate(end)
+
+        # a frame is written with one call and synced before it is indexed, a crash loses at most this frame
+        offset = file.seek(0, os.SEEK_END)
+        payload = compress(header['codec'], b'\n'.join(json.dumps(record, sort_keys=True, default=str).encode() for record in records))
+        file.write(LENGTH.pack(len(payload)) + payload)
+        file.flush()
+        os.fsync(file.fileno())
+
+        with open(path + '.idx', 'a') as index:
+            for record in records:
+                index.write(json.dumps([record_key(record), offset]) + '\n')
+
+def read_header_of(path):
+    with open(path, 'rb') as file:
+        header, _ = read_header(file)
+    return header
+
+def iter_frames(path, start=None):
+    # (offset, records) per frame, one frame in memory at a time
+    with open(path, 'rb') as file:
+        header, data_start = read_header(file)
+        file.seek(start if start is not None else data_start)
+        while True:
+            offset = file.tell()
+            records = read_frame(file, header['codec'])
+            if records is None:
+                return
+            yield offset, records
+
+def iter_records(path):
+    for _, records in iter_frames(path):
+        yield from records
+
+def load_index(path):
+    # repo -> offset of the frame with its latest record; frames appended after the index was written are indexed on the fly
+    index = {}
+    last_offset = None
+    if os.path.exists(path + '.idx'):
+        with open(path + '.idx') as file:
+            for line in file:
+                try:
+                    key, offset = json.loads(line)
+                except ValueError:
+                    continue
+                index[key] = offset
+                last_offset = offset if last_offset is None else max(last_offset, offset)
+
+    frames = iter_frames(path, last_offset)
+    if last_offset is not None:
+        next(frames, None)
+    for offset, records in frames:
+        for record in records:
+            index[record_key(record)] = offset
+    return index
+
+def get_record(path, repo, index=None):
+    if index is None:
+        index = load_index(path)
+    if repo not in index:
+        return None
+    _, records = next(iter_frames(path, index[repo]))
+    matches = [record for record in records if record_key(record) == repo]
+    return matches[-1] if matches else None
+
+def import_yaml(yaml_path, path, schema=None, codec=None):
+    # a concatenation of appended YAML lists still parses as one list
+    data = load_yaml(yaml_path) or []
+    append_records(path, data if isinstance(data, list) else [data], schema, codec)
+
+def export_yaml(path, yaml_path):
+    save_to_file(list(iter_records(path)), yaml_path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert between YAML outputs and record files, or look up a repo.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="append the entries of a YAML list to a record file")
+    import_parser.add_argument("yaml_file")
+    import_parser.add_argument("record_file")
+    import_parser.add_argument("--schema", help="name of the kind of records, checked on every append")
+    export_parser = subparsers.add_parser("export", help="write all records to a YAML list")
+    export_parser.add_argument("record_file")
+    export_parser.add_argument("yaml_file")
+    get_parser = subparsers.add_parser("get", help="print the latest record of a repo")
+    get_parser.add_argument("record_file")
+    get_parser.add_argument("repo")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        import_yaml(args.yaml_file, args.record_file, args.schema)
+    elif args.command == "export":
+        export_yaml(args.record_file, args.yaml_file)
+    else:
+        record = get_record(args.record_file, args.repo)
+        if record is None:
+            sys.exit(f"{args.repo} not found in {args.record_file}")
+        print(json.dumps(record, indent=2))
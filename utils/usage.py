@@ -1,3 +1,5 @@
+import re
+
 def extract_repo_name(url):
     # Convert URL to "owner/repo" format
     if url.startswith("https://github.com/"):
@@ -6,4 +8,49 @@ def extract_repo_name(url):
 
 def extract_repo(data):
     repos = [entry['repo'] for entry in data]
-    return repos
\ No newline at end of file
+    return repos
+
+# "https://github.com/Owner/Repo.git/", "http://www.github.com/owner/repo", "git@github.com:owner/repo" and
+# "owner/repo" all get the key "github.com/owner/repo"; GitHub treats owner and repo names case-insensitively
+URL_PREFIX = re.compile(r'^(?:[a-z+]+://)?(?:[^@/]+@)?(?:www\.)?')
+URL_SUFFIX = re.compile(r'(?:\.git)?/*$')
+
+def normalize_repo_url(url):
+    key = URL_SUFFIX.sub('', URL_PREFIX.sub('', url.strip().lower()))
+    key = key.replace('github.com:', 'github.com/', 1)
+    if key.count('/') == 1 and '.' not in key.split('/')[0]:
+        key = 'github.com/' + key
+    return key
+
+class RepoRegistry:
+    # normalized repo key -> the datasets it was added from, in the order they were added
+    def __init__(self):
+        self.index = {}
+        self.urls = {}
+
+    def add(self, url, dataset):
+        # True the first time a repo is seen in any dataset
+        key = normalize_repo_url(url)
+        self.urls.setdefault(key, url)
+        memberships = self.index.setdefault(key, [])
+        memberships.append(dataset)
+        return len(memberships) == 1
+
+    def add_all(self, data, dataset):
+        # entries with a "repo" field, or plain URL lists such as the older keyword results
+        for entry in data or []:
+            self.add(entry['repo'] if isinstance(entry, dict) else entry, dataset)
+        return self
+
+    def datasets(self, url):
+        return list(dict.fromkeys(self.index.get(normalize_repo_url(url), [])))
+
+    def duplicates(self):
+        # first URL seen of each repo added more than once -> its datasets
+        return {self.urls[key]: list(dict.fromkeys(memberships)) for key, memberships in self.index.items() if len(memberships) > 1}
+
+    def __contains__(self, url):
+        return normalize_repo_url(url) in self.index
+
+    def __len__(self):
+        return len(self.index)